@@ -0,0 +1,335 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import aiohttp
+import numpy as np
+
+from block_index import BlockIndex
+from cursor_store import CursorStore, TradeCursor
+from trade_stats import TradeFeatureAccumulator, parse_trades, split_by_minute
+from tracing import span, record_request
+
+
+BINANCE_API_URL = os.environ.get("BINANCE_API_URL", "https://api.binance.com")
+ETHERSCAN_API_URL = os.environ.get("ETHERSCAN_API_URL", "https://api.etherscan.io/api")
+
+# Binance meters requests by weight per IP and minute; aggTrades costs 2.
+BINANCE_WEIGHT_PER_MINUTE = 6000
+AGG_TRADES_WEIGHT = 2
+# Etherscan free tier; tokentx pages reach at most 10000 results deep
+ETHERSCAN_CALLS_PER_SECOND = 5
+ETHERSCAN_PAGE_SIZE = 1000
+ETHERSCAN_MAX_RESULTS = 10000
+LATEST_BLOCK = 99999999
+
+WINDOW_SECONDS = 3600
+# Rate-limited and transient upstream errors are retried, honouring Retry-After
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 2
+MAX_RETRY_DELAY = 30
+AGG_TRADES_LIMIT = 1000
+
+EMPTY_TRANSACTION_FEATURES = {'std_rush_order': 0.0, 'avg_rush_order': 0.0}
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+def transfer_arrays(tx_list: List[Dict]):
+    """Blocks, timestamps and token values (in whole tokens) of a tokentx result."""
+    blocks = np.array([int(tx['blockNumber']) for tx in tx_list], dtype=np.int64)
+    timestamps = np.array([int(tx['timeStamp']) for tx in tx_list], dtype=np.int64)
+    values = np.array([float(tx['value']) for tx in tx_list]) / 1e18
+    return blocks, timestamps, values
+
+
+def rush_order_features(values: np.ndarray, timestamps: np.ndarray) -> Dict:
+    if len(values) == 0:
+        return {**EMPTY_TRANSACTION_FEATURES, 'transfer_count': 0}
+    min_ts = timestamps.min()
+    max_ts = timestamps.max()
+    time_window = max_ts - min_ts if max_ts > min_ts else 1
+    weighted_values = values * ((timestamps - min_ts) / time_window)
+    std_rush_order = np.std(weighted_values, ddof=1) if len(weighted_values) > 1 else 0.0
+    avg_rush_order = np.mean(weighted_values)
+    return {
+        'transfer_count': len(values),
+        'std_rush_order': std_rush_order,
+        'avg_rush_order': avg_rush_order
+    }
+
+
+class AsyncFeatureCollector:
+    """
+    Fetches the Etherscan and Binance inputs of every coin concurrently. Each
+    upstream host has its own token bucket, so concurrency is bounded by the
+    providers' rate limits instead of fixed sleeps.
+
+    With a `CursorStore`, trades and transfers already seen by an earlier run
+    are not downloaded again: only the delta after the stored cursors is
+    fetched and the window is rolled forward from the stored state. Token
+    transfers are only fetched for the block range of the window, resolved
+    through the `BlockIndex`.
+    """
+
+    def __init__(self, etherscan_api_key: str,
+                 binance_weight_per_minute: float = BINANCE_WEIGHT_PER_MINUTE,
+                 etherscan_calls_per_second: float = ETHERSCAN_CALLS_PER_SECOND,
+                 timeout: float = 15,
+                 state: Optional[CursorStore] = None,
+                 block_index: Optional[BlockIndex] = None):
+        self.etherscan_api_key = etherscan_api_key
+        self.state = state
+        self.block_index = block_index or BlockIndex(":memory:")
+        # Lookups in flight by grid key, so coins gathered together share one request per block
+        self.block_lookups: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.limiters = {
+            urlparse(BINANCE_API_URL).netloc: TokenBucket(binance_weight_per_minute / 60, binance_weight_per_minute / 10),
+            urlparse(ETHERSCAN_API_URL).netloc: TokenBucket(etherscan_calls_per_second, etherscan_calls_per_second),
+        }
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def get_json(self, url: str, params: Dict, weight: float = 1):
+        limiter = self.limiters.get(urlparse(url).netloc)
+        # Like requests, leave out unset parameters
+        params = {key: value for key, value in params.items() if value is not None}
+        for attempt in range(MAX_RETRIES + 1):
+            if limiter:
+                await limiter.acquire(weight)
+            async with self.session.get(url, params=params) as response:
+                body = await response.read()
+                if response.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                    delay = float(response.headers.get('Retry-After', 2 ** attempt))
+                    await asyncio.sleep(min(delay, MAX_RETRY_DELAY))
+                    continue
+                record_request(url, response.status, len(body), retries=attempt)
+                response.raise_for_status()
+                return json.loads(body)
+
+    async def post_json(self, url: str, payload: Dict, timeout: float = 20):
+        async with self.session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            body = await response.read()
+            record_request(url, response.status, len(body))
+            response.raise_for_status()
+            return json.loads(body)
+
+    async def post_bytes(self, url: str, payload: bytes, content_type: str = 'application/octet-stream',
+                         timeout: float = 20) -> bytes:
+        async with self.session.post(url, data=payload, headers={'Content-Type': content_type},
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            body = await response.read()
+            record_request(url, response.status, len(body))
+            response.raise_for_status()
+            return body
+
+    async def block_at(self, timestamp: int, closest: str = 'before') -> Optional[int]:
+        """Block number closest before/after `timestamp`, from the index or Etherscan."""
+        key = (self.block_index.grid(timestamp, closest), closest)
+        lookup = self.block_lookups.get(key)
+        if lookup is None:
+            lookup = asyncio.ensure_future(self._block_at(timestamp, closest))
+            self.block_lookups[key] = lookup
+            lookup.add_done_callback(lambda _: self.block_lookups.pop(key, None))
+        # A cancelled caller must not cancel the lookup the other coins are waiting on
+        return await asyncio.shield(lookup)
+
+    async def _block_at(self, timestamp: int, closest: str) -> Optional[int]:
+        block = self.block_index.lookup(timestamp, closest)
+        if block is not None:
+            return block
+        params = {
+            'module': 'block',
+            'action': 'getblocknobytime',
+            'timestamp': self.block_index.grid(timestamp, closest),
+            'closest': closest,
+            'apikey': self.etherscan_api_key
+        }
+        data = await self.get_json(ETHERSCAN_API_URL, params)
+        if data['status'] != '1':
+            logging.warning(f"Etherscan block lookup failed: {data.get('message', 'Unknown error')}")
+            return None
+        block = int(data['result'])
+        self.block_index.store(timestamp, closest, block)
+        return block
+
+    async def token_transfers(self, contract_address: str, start_block: int, end_block: int = LATEST_BLOCK):
+        """
+        Every transfer of the contract in [start_block, end_block], paginated.
+        Once paging reaches Etherscan's 10000 result depth it restarts from the
+        last block returned, whose possibly partial transfers are fetched again.
+        Returns (blocks, timestamps, values) arrays, or None on an Etherscan error.
+        """
+        pages = []
+        page = 1
+        while True:
+            params = {
+                'module': 'account',
+                'action': 'tokentx',
+                'contractaddress': contract_address,
+                'startblock': start_block,
+                'endblock': end_block,
+                'page': page,
+                'offset': ETHERSCAN_PAGE_SIZE,
+                'sort': 'asc',
+                'apikey': self.etherscan_api_key
+            }
+            data = await self.get_json(ETHERSCAN_API_URL, params)
+            if data['status'] != '1':
+                if data.get('message') == 'No transactions found':
+                    break
+                logging.warning(f"Etherscan error: {data.get('message', 'Unknown error')}")
+                return None
+            pages.append(transfer_arrays(data['result']))
+            if len(data['result']) < ETHERSCAN_PAGE_SIZE:
+                break
+            page += 1
+            if page * ETHERSCAN_PAGE_SIZE > ETHERSCAN_MAX_RESULTS:
+                last_block = int(pages[-1][0][-1])
+                if last_block == start_block:
+                    logging.warning(f"More than {ETHERSCAN_MAX_RESULTS} transfers in block {last_block}; truncated")
+                    break
+                blocks, timestamps, values = (np.concatenate(column) for column in zip(*pages))
+                keep = blocks < last_block
+                pages = [(blocks[keep], timestamps[keep], values[keep])]
+                start_block = last_block
+                page = 1
+        if not pages:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        return tuple(np.concatenate(column) for column in zip(*pages))
+
+    async def transaction_features(self, contract_address: Optional[str]) -> Dict:
+        with span("etherscan"):
+            return await self._transaction_features(contract_address)
+
+    async def _transaction_features(self, contract_address: Optional[str]) -> Dict:
+        if not contract_address:
+            logging.warning("Invalid or missing contract address; skipping Etherscan data.")
+            return dict(EMPTY_TRANSACTION_FEATURES)
+        try:
+            end_time = int(time.time())
+            start_time = end_time - WINDOW_SECONDS
+            start_block = await self.block_at(start_time, 'before')
+            if start_block is None:
+                return dict(EMPTY_TRANSACTION_FEATURES)
+            last_block = self.state.contract_cursor(contract_address) if self.state else None
+            if last_block is not None:
+                start_block = max(start_block, last_block + 1)
+            transfers = await self.token_transfers(contract_address, start_block)
+            if transfers is None:
+                return dict(EMPTY_TRANSACTION_FEATURES)
+            blocks, timestamps, values = transfers
+            recent = (timestamps >= start_time) & (timestamps <= end_time)
+            if self.state is None:
+                return rush_order_features(values[recent], timestamps[recent])
+            if len(blocks):
+                last_block = int(blocks[-1])
+            if last_block is not None:
+                self.state.save_transfers(
+                    contract_address,
+                    zip(blocks[recent].tolist(), timestamps[recent].tolist(), values[recent].tolist()),
+                    last_block, end_time)
+            return rush_order_features(*self.state.transfer_window(contract_address, end_time))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"Etherscan request failed: {str(e)}")
+            return dict(EMPTY_TRANSACTION_FEATURES)
+
+    async def market_features(self, binance_symbol: Optional[str]) -> Dict:
+        with span("binance"):
+            return await self._market_features(binance_symbol)
+
+    async def _market_features(self, binance_symbol: Optional[str]) -> Dict:
+        if not binance_symbol:
+            return {}
+        try:
+            end_time = int(time.time() * 1000)
+            start_time = end_time - WINDOW_SECONDS * 1000
+            cursor = self.state.trade_cursor(binance_symbol) if self.state else None
+            if cursor and cursor.last_trade_time >= start_time:
+                # Resume after the last trade seen; its minute bucket is still open
+                params = {'symbol': binance_symbol, 'fromId': cursor.last_agg_id + 1, 'limit': AGG_TRADES_LIMIT}
+                buckets = self.state.trade_buckets(binance_symbol, cursor.last_trade_time // 60000)
+                last_price = cursor.last_price
+                remainder = None
+            else:
+                # Start on a minute boundary so the oldest bucket is as complete as in a resumed run;
+                # later pages follow by id
+                first_minute = start_time // 60000 * 60000
+                window_end = first_minute + WINDOW_SECONDS * 1000 - 1
+                params = {'symbol': binance_symbol, 'startTime': first_minute, 'endTime': min(end_time, window_end),
+                          'limit': AGG_TRADES_LIMIT}
+                # A time range may span at most an hour, so a short first page leaves up to a minute
+                # before `end_time` unfetched
+                remainder = {'symbol': binance_symbol, 'startTime': window_end + 1, 'endTime': end_time,
+                             'limit': AGG_TRADES_LIMIT} if window_end < end_time else None
+                buckets = {}
+                last_price = None
+            last_trade = None
+            while True:
+                new_trades = await self.get_json(f"{BINANCE_API_URL}/api/v3/aggTrades", params, AGG_TRADES_WEIGHT)
+                if new_trades:
+                    trades = parse_trades(new_trades)
+                    for minute, chunk in split_by_minute(trades):
+                        bucket = buckets.get(minute) or TradeFeatureAccumulator()
+                        bucket.last_price = last_price
+                        bucket.add_trades(chunk)
+                        buckets[minute] = bucket
+                        last_price = bucket.last_price
+                    last_trade = trades[-1]
+                    params = {'symbol': binance_symbol, 'fromId': int(last_trade['a']) + 1, 'limit': AGG_TRADES_LIMIT}
+                if len(new_trades) < AGG_TRADES_LIMIT:
+                    if remainder is None:
+                        break
+                    # One more page: by id after the trades seen, or by time when there were none
+                    if last_trade is None:
+                        params = remainder
+                remainder = None
+            if self.state is None:
+                window = TradeFeatureAccumulator()
+                for minute in sorted(buckets):
+                    window.merge(buckets[minute])
+                return window.features()
+            if last_trade is not None:
+                cursor = TradeCursor(int(last_trade['a']), int(last_trade['T']), last_price)
+                self.state.save_trades(binance_symbol, buckets, cursor, end_time)
+            return self.state.trade_window(binance_symbol, end_time).features()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"Binance API Error: {str(e)}")
+            return {}
+
+    async def coin_features(self, binance_symbol: Optional[str], contract_address: Optional[str]) -> Dict:
+        transaction, market = await asyncio.gather(
+            self.transaction_features(contract_address),
+            self.market_features(binance_symbol)
+        )
+        return {**transaction, **market}
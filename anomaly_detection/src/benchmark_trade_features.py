@@ -0,0 +1,82 @@
+import json
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+from trade_stats import TradeFeatureAccumulator
+
+
+PAGE_SIZE = 1000
+
+
+def synthetic_pages(n_trades: int, seed: int = 0):
+    """Yields decoded aggTrades pages as the Binance client would, one at a time."""
+    rng = np.random.default_rng(seed)
+    price = 1.0
+    trade_id = 0
+    for start in range(0, n_trades, PAGE_SIZE):
+        n = min(PAGE_SIZE, n_trades - start)
+        prices = price * np.exp(np.cumsum(rng.normal(0, 1e-4, n)))
+        price = prices[-1]
+        page = [{"a": trade_id + i, "p": f"{p:.8f}", "q": f"{q:.4f}", "f": 0, "l": 0,
+                 "T": 1700000000000 + trade_id + i, "m": bool(m), "M": True}
+                for i, (p, q, m) in enumerate(zip(prices, rng.exponential(10, n), rng.integers(0, 2, n)))]
+        trade_id += n
+        # Round-trip through JSON so the page holds the same objects a response would
+        yield json.loads(json.dumps(page))
+
+
+def list_features(pages):
+    """The previous implementation: keep every trade dict, then build lists."""
+    trades = []
+    for page in pages:
+        trades.extend(page)
+    prices = [float(t['p']) for t in trades]
+    volumes = [float(t['q']) for t in trades]
+    price_changes = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, len(prices))] if len(prices) > 1 else []
+    return {
+        'std_trades': np.std([1 if t['m'] else -1 for t in trades], ddof=1) if len(trades) > 1 else 0.0,
+        'std_volume': np.std(volumes, ddof=1) if len(volumes) > 1 else 0.0,
+        'avg_volume': np.mean(volumes) if volumes else 0.0,
+        'std_price': np.std(price_changes, ddof=1) if len(price_changes) > 1 else 0.0,
+        'avg_price': np.mean(prices) if prices else 0.0,
+        'avg_price_max': max(prices) if prices else 0.0
+    }
+
+
+def streaming_features(pages):
+    accumulator = TradeFeatureAccumulator()
+    for page in pages:
+        accumulator.add_page(page)
+    return accumulator.features()
+
+
+def measure(fn, n_trades: int):
+    # Timing runs over pages decoded up front; the memory run streams them
+    # from the generator so only the computation's own footprint is retained.
+    pages = list(synthetic_pages(n_trades))
+    start = time.perf_counter()
+    features = fn(pages)
+    elapsed = time.perf_counter() - start
+    del pages
+
+    tracemalloc.start()
+    fn(synthetic_pages(n_trades))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return features, elapsed, peak / 2**20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare list-based and streaming aggTrades feature computation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    args = parser.parse_args()
+
+    print(f"{'trades':>8} | {'list time':>9} | {'list peak':>10} | {'stream time':>11} | {'stream peak':>11} | max rel diff")
+    for n_trades in args.sizes:
+        expected, list_time, list_peak = measure(list_features, n_trades)
+        actual, stream_time, stream_peak = measure(streaming_features, n_trades)
+        diff = max(abs(actual[k] - expected[k]) / max(abs(expected[k]), 1e-300) for k in expected)
+        print(f"{n_trades:>8} | {list_time * 1e3:>7.1f}ms | {list_peak:>8.1f}MB | "
+              f"{stream_time * 1e3:>9.1f}ms | {stream_peak:>9.1f}MB | {diff:.1e}")
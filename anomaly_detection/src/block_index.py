@@ -0,0 +1,46 @@
+import time
+import sqlite3
+from typing import Optional
+
+from cursor_store import STATE_DB_PATH
+
+
+class BlockIndex:
+    """
+    Local cache of Etherscan getblocknobytime answers.
+
+    Timestamps are snapped to a grid of `resolution` seconds (down for
+    closest=before, up for closest=after), so consecutive runs share their
+    lookups and only the grid points that are new since the previous run cost
+    an API call. Snapping only ever widens the block range; transfers outside
+    the window are filtered locally by timestamp. Entries older than
+    `retention_seconds` are dropped as new ones are added.
+    """
+
+    def __init__(self, path: str = STATE_DB_PATH, resolution: int = 60, retention_seconds: int = 7 * 86400):
+        self.resolution = resolution
+        self.retention_seconds = retention_seconds
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS block_time ("
+            "ts INTEGER NOT NULL, closest TEXT NOT NULL, block INTEGER NOT NULL, PRIMARY KEY (ts, closest))"
+        )
+
+    def close(self):
+        self.conn.close()
+
+    def grid(self, timestamp: int, closest: str) -> int:
+        if closest == 'after':
+            return -(-timestamp // self.resolution) * self.resolution
+        return timestamp // self.resolution * self.resolution
+
+    def lookup(self, timestamp: int, closest: str) -> Optional[int]:
+        row = self.conn.execute("SELECT block FROM block_time WHERE ts = ? AND closest = ?",
+                                (self.grid(timestamp, closest), closest)).fetchone()
+        return row[0] if row else None
+
+    def store(self, timestamp: int, closest: str, block: int):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO block_time VALUES (?, ?, ?)",
+                              (self.grid(timestamp, closest), closest, block))
+            self.conn.execute("DELETE FROM block_time WHERE ts < ?", (int(time.time()) - self.retention_seconds,))
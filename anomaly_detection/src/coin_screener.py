@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import heapq
+import logging
+from typing import Dict, List
+import numpy as np
+import requests
+
+from response_cache import ResponseCache
+
+
+CMC_LISTINGS_URL = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/listings/latest"
+CMC_PAGE_SIZE = 5000
+
+# The previous hard filters: a coin is a candidate if any of them holds
+MAX_MARKET_CAP = 1e8
+MIN_VOLUME_24H = 5e6
+MIN_AGE_DAYS = 365
+MIN_MARKET_PAIRS = 3
+
+# Weights of the risk score components, each scaled to [0, 1]; override with a JSON object
+RISK_WEIGHTS = {'small_cap': 1.0, 'turnover': 1.0, 'young': 1.0, 'few_pairs': 0.5}
+RISK_WEIGHTS.update(json.loads(os.environ.get("RISK_SCORE_WEIGHTS", "{}")))
+
+
+def fetch_listings(cache: ResponseCache, headers: Dict, params: Dict, ttl: float,
+                   time_budget: float, page_size: int = CMC_PAGE_SIZE) -> List[Dict]:
+    """
+    Pages through the whole CMC listings universe. Paging stops early once
+    `time_budget` seconds are spent; the coins fetched so far are kept.
+    """
+    deadline = time.monotonic() + time_budget
+    coins = []
+    start = 1
+    while True:
+        try:
+            page = cache.get_json(CMC_LISTINGS_URL, ttl, params={**params, 'start': start, 'limit': page_size},
+                                  headers=headers)['data']
+        except requests.exceptions.RequestException:
+            if not coins:
+                raise
+            logging.warning(f"CMC paging failed after {len(coins)} listings; screening those")
+            break
+        coins.extend(page)
+        if len(page) < page_size:
+            break
+        if time.monotonic() > deadline:
+            logging.warning(f"Screening time budget spent after {len(coins)} listings")
+            break
+        start += page_size
+    return coins
+
+
+def listing_columns(coins: List[Dict]) -> Dict[str, np.ndarray]:
+    """Loads listings into one array per field. Missing numbers are NaN and missing dates NaT."""
+    def quote(coin, field):
+        value = (coin.get('quote') or {}).get('USD', {}).get(field)
+        return np.nan if value is None else value
+
+    platforms = [coin.get('platform') or {} for coin in coins]
+    return {
+        'symbol': np.array([coin.get('symbol', '') for coin in coins], dtype=object),
+        'token_address': np.array([p.get('token_address') for p in platforms], dtype=object),
+        'market_cap': np.fromiter((quote(c, 'market_cap') for c in coins), dtype='f8', count=len(coins)),
+        'volume_24h': np.fromiter((quote(c, 'volume_24h') for c in coins), dtype='f8', count=len(coins)),
+        'num_market_pairs': np.fromiter((c.get('num_market_pairs') or np.nan for c in coins), dtype='f8',
+                                        count=len(coins)),
+        # '2021-05-04T00:00:00.000Z': drop the zone suffix, numpy parses the rest as UTC
+        'date_added': np.array([(c.get('date_added') or 'NaT').rstrip('Z') for c in coins], dtype='datetime64[ms]')
+    }
+
+
+def risk_scores(columns: Dict[str, np.ndarray], now: np.datetime64, weights: Dict = None) -> Dict[str, np.ndarray]:
+    """Age, candidate mask and weighted risk score of every listing."""
+    weights = weights or RISK_WEIGHTS
+    market_cap, volume, pairs = columns['market_cap'], columns['volume_24h'], columns['num_market_pairs']
+    dated = ~np.isnat(columns['date_added'])
+    age_days = np.full(len(dated), np.nan)
+    age_days[dated] = (now - columns['date_added'][dated]) // np.timedelta64(1, 'D')
+
+    # An unreported field is unknown rather than risky: it fails every filter (NaN compares
+    # false) and its score components count as zero
+    candidate = ((market_cap < MAX_MARKET_CAP) | (volume < MIN_VOLUME_24H)
+                 | (age_days < MIN_AGE_DAYS) | (pairs < MIN_MARKET_PAIRS))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        components = {
+            'small_cap': np.clip(1 - np.log10(market_cap + 1) / np.log10(MAX_MARKET_CAP), 0, 1),
+            'turnover': np.where(market_cap > 0, np.clip(volume / market_cap, 0, 1), 0.0),
+            'young': np.clip(1 - age_days / MIN_AGE_DAYS, 0, 1),
+            'few_pairs': np.clip(1 - pairs / (2 * MIN_MARKET_PAIRS), 0, 1)
+        }
+    score = sum(weights.get(name, 0.0) * np.nan_to_num(component) for name, component in components.items())
+    return {'age_days': age_days, 'candidate': candidate, 'score': score}
+
+
+def screen(coins: List[Dict], top_k: int, blacklist=(), weights: Dict = None) -> List[Dict]:
+    """The `top_k` riskiest candidate coins, highest score first."""
+    if not coins:
+        return []
+    columns = listing_columns(coins)
+    scored = risk_scores(columns, np.datetime64('now', 'ms'), weights)
+    eligible = scored['candidate'] & ~np.isin(columns['symbol'], list(blacklist))
+    indices = np.flatnonzero(eligible)
+    score = scored['score']
+    top = heapq.nlargest(top_k, indices.tolist(), key=score.__getitem__)
+    logging.info(f"Screened {len(coins)} listings: {len(indices)} candidates, kept {len(top)}")
+    return [{
+        'symbol': columns['symbol'][i],
+        'token_address': columns['token_address'][i],
+        'market_cap': None if np.isnan(columns['market_cap'][i]) else float(columns['market_cap'][i]),
+        'volume_24h': None if np.isnan(columns['volume_24h'][i]) else float(columns['volume_24h'][i]),
+        'age_days': None if np.isnan(scored['age_days'][i]) else int(scored['age_days'][i]),
+        'risk_score': float(score[i])
+    } for i in top]
+
+
+def screen_universe(cache: ResponseCache, headers: Dict, params: Dict, ttl: float, top_k: int,
+                    time_budget: float, blacklist=()) -> List[Dict]:
+    try:
+        coins = fetch_listings(cache, headers, params, ttl, time_budget)
+    except requests.exceptions.RequestException as e:
+        logging.error(f"CMC API Error: {str(e)}")
+        return []
+    return screen(coins, top_k, blacklist)
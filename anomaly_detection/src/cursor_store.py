@@ -0,0 +1,124 @@
+import os
+import sqlite3
+from collections import namedtuple
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+
+from trade_stats import TradeFeatureAccumulator
+
+
+STATE_DB_PATH = os.environ.get("COLLECTOR_STATE_DB", "collector_state.db")
+
+TradeCursor = namedtuple("TradeCursor", ["last_agg_id", "last_trade_time", "last_price"])
+
+_STATE_COLUMNS = [
+    "sides_n", "sides_mean", "sides_m2",
+    "volumes_n", "volumes_mean", "volumes_m2",
+    "prices_n", "prices_mean", "prices_m2",
+    "changes_n", "changes_mean", "changes_m2",
+    "max_price", "last_price"
+]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS trade_cursor (
+    symbol TEXT PRIMARY KEY,
+    last_agg_id INTEGER NOT NULL,
+    last_trade_time INTEGER NOT NULL,
+    last_price REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trade_bucket (
+    symbol TEXT NOT NULL,
+    minute INTEGER NOT NULL,
+    {", ".join(f"{column} REAL NOT NULL" for column in _STATE_COLUMNS)},
+    PRIMARY KEY (symbol, minute)
+);
+CREATE TABLE IF NOT EXISTS contract_cursor (
+    contract TEXT PRIMARY KEY,
+    last_block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transfer (
+    contract TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transfer_contract_ts ON transfer (contract, ts);
+"""
+
+
+class CursorStore:
+    """
+    Collector state kept between runs, so each run only fetches what is new.
+
+    Per Binance symbol: the last aggregate trade seen and one row of running
+    moments per minute of trades. Per token contract: the last block seen and
+    the raw transfers (timestamp, value) of the recent window, which the rush
+    order features need individually. Rows older than the window are pruned
+    whenever the state is saved.
+    """
+
+    def __init__(self, path: str = STATE_DB_PATH, window_seconds: int = 3600):
+        self.path = path
+        self.window_seconds = window_seconds
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def trade_cursor(self, symbol: str) -> Optional[TradeCursor]:
+        row = self.conn.execute(
+            "SELECT last_agg_id, last_trade_time, last_price FROM trade_cursor WHERE symbol = ?", (symbol,)
+        ).fetchone()
+        return TradeCursor(*row) if row else None
+
+    def trade_buckets(self, symbol: str, since_minute: int = 0) -> Dict[int, TradeFeatureAccumulator]:
+        rows = self.conn.execute(
+            f"SELECT minute, {', '.join(_STATE_COLUMNS)} FROM trade_bucket "
+            "WHERE symbol = ? AND minute >= ? ORDER BY minute", (symbol, since_minute)
+        )
+        return {row[0]: TradeFeatureAccumulator.from_state(row[1:]) for row in rows}
+
+    def save_trades(self, symbol: str, buckets: Dict[int, TradeFeatureAccumulator], cursor: TradeCursor, now_ms: int):
+        """Upserts the touched minute buckets and moves the symbol's cursor in one transaction."""
+        oldest_minute = (now_ms - self.window_seconds * 1000) // 60000
+        placeholders = ", ".join("?" * (len(_STATE_COLUMNS) + 2))
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO trade_bucket (symbol, minute, {', '.join(_STATE_COLUMNS)}) "
+                f"VALUES ({placeholders})",
+                [(symbol, minute, *bucket.state()) for minute, bucket in buckets.items()]
+            )
+            self.conn.execute("INSERT OR REPLACE INTO trade_cursor VALUES (?, ?, ?, ?)", (symbol, *cursor))
+            self.conn.execute("DELETE FROM trade_bucket WHERE symbol = ? AND minute < ?", (symbol, oldest_minute))
+
+    def trade_window(self, symbol: str, now_ms: int) -> TradeFeatureAccumulator:
+        """Merges the minute buckets of the window ending at `now_ms`, oldest first."""
+        window = TradeFeatureAccumulator()
+        for bucket in self.trade_buckets(symbol, (now_ms - self.window_seconds * 1000) // 60000).values():
+            window.merge(bucket)
+        return window
+
+    def contract_cursor(self, contract: str) -> Optional[int]:
+        row = self.conn.execute("SELECT last_block FROM contract_cursor WHERE contract = ?", (contract,)).fetchone()
+        return row[0] if row else None
+
+    def save_transfers(self, contract: str, transfers: Iterable[Tuple[int, int, float]], last_block: int, now: int):
+        """Appends (block, timestamp, value) transfers and moves the contract's cursor."""
+        with self.conn:
+            self.conn.executemany("INSERT INTO transfer VALUES (?, ?, ?, ?)",
+                                  ((contract, *transfer) for transfer in transfers))
+            self.conn.execute("INSERT OR REPLACE INTO contract_cursor VALUES (?, ?)", (contract, last_block))
+            self.conn.execute("DELETE FROM transfer WHERE contract = ? AND ts < ?",
+                              (contract, now - self.window_seconds))
+
+    def transfer_window(self, contract: str, now: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Values and timestamps of the contract's transfers in the window ending at `now`."""
+        rows = self.conn.execute(
+            "SELECT value, ts FROM transfer WHERE contract = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+            (contract, now - self.window_seconds, now)
+        ).fetchall()
+        if not rows:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        values, timestamps = zip(*rows)
+        return np.array(values), np.array(timestamps, dtype=np.int64)
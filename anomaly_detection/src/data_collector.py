@@ -1,12 +1,22 @@
+import os
 import requests
 import numpy as np
 from datetime import datetime
 import time
+import asyncio
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import dotenv
 from mistralai import Mistral
 import schedule
+from async_collector import AsyncFeatureCollector
+from block_index import BlockIndex
+from cursor_store import CursorStore
+from coin_screener import screen_universe
+from feature_store import FeatureStore
+from response_cache import ResponseCache
+import tracing
+from tracing import span, record_request
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -20,22 +30,46 @@ API_KEYS = {
 
 MISTRAL_MODEL_NAME = "mistral-large-latest"
 
-PND_DETECTION_MODEL_ENDPOINT = "http://20.199.80.240:5040/predict"
+# Rows are scored as a raw float32 matrix, in the column order the server declares on /schema
+PND_DETECTION_RAW_ENDPOINT = "http://20.199.80.240:5040/predict/raw"
+PND_DETECTION_SCHEMA_ENDPOINT = "http://20.199.80.240:5040/schema"
 SENTIMENT_ANALYSIS_MODEL_TELEMEGRAM_MESSAGES_ENDPOINT = "http://20.199.80.240:5030/telegram/messages"
 AI_BLOGGER_ENDPOINT = "http://20.199.80.240:5050/send-message"
+# Runs only fetch what is new since the previous one, so they can be frequent
+RUN_INTERVAL_MINUTES = int(os.environ.get("RUN_INTERVAL_MINUTES", 240))
+# How long cached upstream responses are served without asking again (seconds)
+EXCHANGE_INFO_TTL = int(os.environ.get("EXCHANGE_INFO_TTL", 6 * 3600))
+CMC_LISTINGS_TTL = int(os.environ.get("CMC_LISTINGS_TTL", 15 * 60))
+# Risky coins passed on to feature extraction, and the seconds allowed for paging CMC
+TOP_K_COINS = int(os.environ.get("TOP_K_COINS", 25))
+SCREENING_TIME_BUDGET = float(os.environ.get("SCREENING_TIME_BUDGET", 30))
+# Collected features younger than this are reused instead of fetched again (seconds)
+FEATURE_VALIDITY_SECONDS = int(os.environ.get("FEATURE_VALIDITY_SECONDS", 300))
 BLACKLIST = ['USDT', 'USDC', 'DAI']
+FEATURE_KEYS = [
+    'std_rush_order', 'avg_rush_order',
+    'std_trades', 'std_volume', 'avg_volume',
+    'std_price', 'avg_price', 'avg_price_max',
+    'hour_sin', 'hour_cos', 'minute_sin', 'minute_cos'
+]
+# Window summaries as collected, before defaults and clipping
+RAW_KEYS = ['trade_count', 'transfer_count'] + FEATURE_KEYS[:8]
 
 llm = Mistral(api_key=API_KEYS['MISTRAL_API_KEY'])
+response_cache = ResponseCache()
+feature_store = FeatureStore(feature_names=FEATURE_KEYS, raw_names=RAW_KEYS)
 
 
 def get_valid_binance_pairs() -> set:
     url = "https://api.binance.com/api/v3/exchangeInfo"
+
+    def build_pairs():
+        data = response_cache.get_json(url, EXCHANGE_INFO_TTL)
+        return sorted(s["symbol"] for s in data["symbols"])
+
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        valid_pairs = {s["symbol"] for s in data["symbols"]}
-        return valid_pairs
+        # The symbol list is cached on its own, so a hit never parses the full exchangeInfo document
+        return set(response_cache.derived("binance_pairs", EXCHANGE_INFO_TTL, build_pairs))
     except Exception as e:
         logging.error("Error fetching Binance exchange info: " + str(e))
         return set()
@@ -81,142 +115,54 @@ class PumpDetector:
             'convert': 'USD',
             'aux': 'num_market_pairs,date_added,platform'
         }
-        self.valid_binance_pairs = get_valid_binance_pairs()
+        with span("exchange_info"):
+            self.valid_binance_pairs = get_valid_binance_pairs()
+        self.state = CursorStore()
+        self.block_index = BlockIndex()
+        self.pnd_schema = None
+
+    def close(self):
+        self.state.close()
+        self.block_index.close()
+
+    def new_collector(self) -> AsyncFeatureCollector:
+        return AsyncFeatureCollector(API_KEYS['ETHERSCAN'], state=self.state, block_index=self.block_index)
 
     def get_risky_coins(self) -> List[Dict]:
-        try:
-            url = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/listings/latest"
-            params = {**self.base_params, 'start': 1, 'limit': 500}
-            response = requests.get(url, headers=self.cmc_headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            risky_coins = []
-            current_time = datetime.now()
-            for coin in data['data']:
-                try:
-                    if coin['symbol'] in BLACKLIST:
-                        continue
-                    added_date = datetime.strptime(coin['date_added'], '%Y-%m-%dT%H:%M:%S.%fZ')
-                    age_days = (current_time - added_date).days
-                    market_cap = coin['quote']['USD']['market_cap']
-                    volume = coin['quote']['USD']['volume_24h']
-                    if (market_cap < 1e8 or volume < 5e6) or age_days < 365 or coin['num_market_pairs'] < 3:
-                        contract_address = None
-                        if coin.get('platform'):
-                            addr = coin['platform'].get('token_address')
-                            if is_valid_erc20(addr):
-                                contract_address = addr
-                            else:
-                                logging.warning(f"Invalid contract address for {coin['symbol']}")
-                        risky_coins.append({
-                            'symbol': coin['symbol'],
-                            'contract_address': contract_address,
-                            'market_cap': market_cap,
-                            'volume_24h': volume,
-                            'age_days': age_days
-                        })
-                except KeyError as e:
-                    logging.warning(f"Missing field {str(e)} in coin data")
-                    continue
-            logging.info(f"Found {len(risky_coins)} risky coins.")
-            return sorted(risky_coins, key=lambda x: x['market_cap'])[:10]
-        except requests.exceptions.RequestException as e:
-            logging.error(f"CMC API Error: {str(e)}")
-            return []
+        # The whole listings universe is screened; small new coins mostly rank beyond the first 500
+        with span("screening"):
+            screened = screen_universe(response_cache, self.cmc_headers, self.base_params, CMC_LISTINGS_TTL,
+                                       top_k=TOP_K_COINS, time_budget=SCREENING_TIME_BUDGET, blacklist=BLACKLIST)
+        risky_coins = []
+        for coin in screened:
+            addr = coin.pop('token_address')
+            contract_address = addr if is_valid_erc20(addr) else None
+            if addr and not contract_address:
+                logging.warning(f"Invalid contract address for {coin['symbol']}")
+            risky_coins.append({'contract_address': contract_address, **coin})
+        logging.info(f"Found {len(risky_coins)} risky coins.")
+        return risky_coins
+
+    def get_binance_symbol(self, symbol: str):
+        valid_symbol = validate_binance_pair(symbol, self.valid_binance_pairs)
+        if not valid_symbol:
+            logging.warning(f"Skipping Binance market features for invalid symbol: {symbol}USDT")
+        return valid_symbol
+
+    async def _collect(self, fetch):
+        async with self.new_collector() as collector:
+            return await fetch(collector)
 
     def get_transaction_features(self, contract_address: str) -> Dict:
-        if not contract_address or not is_valid_erc20(contract_address):
-            logging.warning("Invalid or missing contract address; skipping Etherscan data.")
-            return {'std_rush_order': 0.0, 'avg_rush_order': 0.0}
-        try:
-            end_time = int(time.time())
-            start_time = end_time - 3600
-            url = "https://api.etherscan.io/api"
-            params = {
-                'module': 'account',
-                'action': 'tokentx',
-                'contractaddress': contract_address,
-                'startblock': 0,
-                'endblock': 99999999,
-                'sort': 'asc',
-                'apikey': API_KEYS['ETHERSCAN'],
-                'startTimestamp': start_time,
-                'endTimestamp': end_time
-            }
-            response = requests.get(url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            if data['status'] != '1':
-                logging.warning(f"Etherscan error: {data.get('message', 'Unknown error')}")
-                return {'std_rush_order': 0.0, 'avg_rush_order': 0.0}
-            tx_list = data['result']
-            if not tx_list:
-                return {'std_rush_order': 0.0, 'avg_rush_order': 0.0}
-            values = [float(tx['value']) / 1e18 for tx in tx_list]
-            timestamps = [int(tx['timeStamp']) for tx in tx_list]
-            min_ts = min(timestamps)
-            max_ts = max(timestamps)
-            time_window = max_ts - min_ts if max_ts > min_ts else 1
-            weighted_values = [v * ((ts - min_ts) / time_window) for v, ts in zip(values, timestamps)]
-            std_rush_order = np.std(weighted_values, ddof=1) if len(weighted_values) > 1 else 0.0
-            avg_rush_order = np.mean(weighted_values)
-            return {
-                'std_rush_order': std_rush_order,
-                'avg_rush_order': avg_rush_order
-            }
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Etherscan request failed: {str(e)}")
-            return {'std_rush_order': 0.0, 'avg_rush_order': 0.0}
+        if not is_valid_erc20(contract_address):
+            contract_address = None
+        return asyncio.run(self._collect(lambda c: c.transaction_features(contract_address)))
 
     def get_market_features(self, symbol: str) -> Dict:
-        valid_symbol = validate_binance_pair(symbol, self.valid_binance_pairs)
+        valid_symbol = self.get_binance_symbol(symbol)
         if not valid_symbol:
-            logging.warning(f"Skipping Binance market features for invalid symbol: {symbol}USDT")
-            return {}
-        try:
-            end_time = int(time.time() * 1000)
-            start_time = end_time - 3600000
-            trades = []
-            while True:
-                url = "https://api.binance.com/api/v3/aggTrades"
-                params = {
-                    'symbol': valid_symbol,
-                    'startTime': start_time,
-                    'endTime': end_time,
-                    'limit': 1000
-                }
-                response = requests.get(url, params=params, timeout=15)
-                response.raise_for_status()
-                new_trades = response.json()
-                if not new_trades:
-                    break
-                trades.extend(new_trades)
-                start_time = int(new_trades[-1]['T']) + 1
-                if len(new_trades) < 1000:
-                    break
-                time.sleep(0.2)
-            if not trades:
-                return {}
-            prices = [float(t['p']) for t in trades]
-            volumes = [float(t['q']) for t in trades]
-            price_changes = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, len(prices))] if len(prices) > 1 else []
-            std_trades = np.std([1 if t['m'] else -1 for t in trades], ddof=1) if len(trades) > 1 else 0.0
-            std_volume = np.std(volumes, ddof=1) if len(volumes) > 1 else 0.0
-            avg_volume = np.mean(volumes) if volumes else 0.0
-            std_price = np.std(price_changes, ddof=1) if len(price_changes) > 1 else 0.0
-            avg_price = np.mean(prices) if prices else 0.0
-            avg_price_max = max(prices) if prices else 0.0
-            return {
-                'std_trades': std_trades,
-                'std_volume': std_volume,
-                'avg_volume': avg_volume,
-                'std_price': std_price,
-                'avg_price': avg_price,
-                'avg_price_max': avg_price_max
-            }
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Binance API Error: {str(e)}")
             return {}
+        return asyncio.run(self._collect(lambda c: c.market_features(valid_symbol)))
 
     def calculate_time_features(self) -> Dict:
         now = datetime.now()
@@ -227,59 +173,117 @@ class PumpDetector:
             'minute_cos': np.cos(2 * np.pi * now.minute / 60)
         }
 
-    def generate_features(self, symbol: str, contract_address: str) -> Dict:
+    def build_features(self, collected: Dict) -> Dict:
         features = {}
         features.update(self.calculate_time_features())
-        features.update(self.get_transaction_features(contract_address))
-        features.update(self.get_market_features(symbol))
-        expected_keys = [
-            'std_rush_order', 'avg_rush_order',
-            'std_trades', 'std_volume', 'avg_volume',
-            'std_price', 'avg_price', 'avg_price_max',
-            'hour_sin', 'hour_cos', 'minute_sin', 'minute_cos'
-        ]
-        for key in expected_keys:
+        features.update(collected)
+        for key in FEATURE_KEYS:
             if key not in features or features[key] is None:
                 features[key] = 0.0
         return sanitize_features(features)
 
+    def generate_features(self, symbol: str, contract_address: str) -> Dict:
+        if not is_valid_erc20(contract_address):
+            contract_address = None
+        collected = asyncio.run(self._collect(
+            lambda c: c.coin_features(self.get_binance_symbol(symbol), contract_address)))
+        return self.build_features(collected)
+
+    async def collect_coin(self, collector: AsyncFeatureCollector, coin: Dict, stored: Optional[Dict] = None):
+        try:
+            if stored is not None:
+                logging.info(f"Reusing features of {coin['symbol']} from {int(time.time() - stored['ts'])}s ago")
+                collected = {key: float(value) for key, value in zip(RAW_KEYS, stored['raw']) if not np.isnan(value)}
+            else:
+                logging.info(f"Processing {coin['symbol']}")
+                contract_address = coin['contract_address'] if is_valid_erc20(coin['contract_address']) else None
+                with span("coin", coin=coin['symbol']):
+                    collected = await collector.coin_features(self.get_binance_symbol(coin['symbol']),
+                                                              contract_address)
+            return {
+                'symbol': coin['symbol'],
+                'features': self.build_features(collected),
+                'collected': collected,
+                # Reused rows are already in the store; keeping their original timestamp lets them expire
+                'reused': stored is not None
+            }
+        except Exception as e:
+            logging.error(f"Failed processing {coin['symbol']}: {str(e)}")
+            return None
+
+    def store_results(self, results: List[Dict]):
+        """Appends the run's newly collected features, raw summaries and verdicts to the feature store."""
+        results = [result for result in results if not result['reused']]
+        if not results:
+            return
+        feature_store.append(
+            int(time.time()),
+            [result['symbol'] for result in results],
+            [[result['features'][key] for key in FEATURE_KEYS] for result in results],
+            [[result['collected'].get(key, np.nan) for key in RAW_KEYS] for result in results],
+            [result.get('prediction', -1) for result in results],
+            [result.get('probability') if result.get('probability') is not None else np.nan for result in results]
+        )
+
+    async def score_features(self, collector: AsyncFeatureCollector,
+                             features: List[Dict]) -> Tuple[List[int], List[float]]:
+        """Predictions and pump probabilities of feature dicts, from one binary request to the PnD model."""
+        if self.pnd_schema is None:
+            self.pnd_schema = await collector.get_json(PND_DETECTION_SCHEMA_ENDPOINT, {})
+        columns = self.pnd_schema['columns']
+        matrix = np.array([[row.get(key, 0.0) for key in columns] for row in features],
+                          dtype=self.pnd_schema['request_dtype'])
+        body = await collector.post_bytes(PND_DETECTION_RAW_ENDPOINT, matrix.tobytes(),
+                                          self.pnd_schema['content_type'])
+        scored = np.frombuffer(body, dtype=[tuple(field) for field in self.pnd_schema['response_fields']])
+        return scored['prediction'].astype(int).tolist(), scored['probability'].astype(float).tolist()
+
+    async def analyze_coins_async(self, risky_coins: List[Dict]) -> List[Dict]:
+        stored = feature_store.latest(int(time.time()) - FEATURE_VALIDITY_SECONDS)
+        async with self.new_collector() as collector:
+            collected = await asyncio.gather(*(self.collect_coin(collector, coin, stored.get(coin['symbol']))
+                                               for coin in risky_coins))
+            results = [result for result in collected if result is not None]
+            if not results:
+                return []
+            # Every coin of the run is scored in a single request
+            logging.info("Payload to model: %s", [result['features'] for result in results])
+            try:
+                with span("pnd_model", rows=len(results)):
+                    scored = await self.score_features(collector, [result['features'] for result in results])
+            except Exception as e:
+                logging.error(f"PnD model request failed: {str(e)}")
+                scored = None
+        if scored is not None:
+            for result, prediction, probability in zip(results, *scored):
+                result['prediction'] = prediction
+                result['probability'] = probability
+        # Stored even when the model was unreachable, for later scoring or retraining
+        try:
+            self.store_results(results)
+        except OSError as e:
+            logging.error(f"Failed writing the feature store: {str(e)}")
+        for result in results:
+            del result['collected']
+            del result['reused']
+        return results if scored is not None else []
+
     def analyze_coins(self):
         risky_coins = self.get_risky_coins()
         if not risky_coins:
             logging.warning("No risky coins found")
             return []
-        predictions = []
-        expected_keys = {
-            "std_rush_order", "avg_rush_order",
-            "std_trades", "std_volume", "avg_volume",
-            "std_price", "avg_price", "avg_price_max",
-            "hour_sin", "hour_cos", "minute_sin", "minute_cos"
-        }
-        for coin in risky_coins:
-            try:
-                logging.info(f"Processing {coin['symbol']}")
-                features = self.generate_features(coin['symbol'], coin['contract_address'])
-                model_payload = { key: features.get(key, 0.0) for key in expected_keys }
-                logging.info("Payload to model: %s", model_payload)
-                headers = {"Content-Type": "application/json"}
-                response = requests.post(PND_DETECTION_MODEL_ENDPOINT, json=model_payload, headers=headers, timeout=20)
-                response.raise_for_status()
-                prediction = response.json()
-                predictions.append({
-                    'symbol': coin['symbol'],
-                    'features': features,
-                    'prediction': prediction
-                })
-                time.sleep(1)
-            except Exception as e:
-                logging.error(f"Failed processing {coin['symbol']}: {str(e)}")
-                continue
-        return predictions
+        # All coins are collected concurrently; wall-clock time follows the slowest coin
+        with span("collect", coins=len(risky_coins)):
+            return asyncio.run(self.analyze_coins_async(risky_coins))
 
 
 def get_sentiment_analysis():
     try:
-        response = requests.get(SENTIMENT_ANALYSIS_MODEL_TELEMEGRAM_MESSAGES_ENDPOINT)
+        with span("sentiment"):
+            response = requests.get(SENTIMENT_ANALYSIS_MODEL_TELEMEGRAM_MESSAGES_ENDPOINT)
+            record_request(SENTIMENT_ANALYSIS_MODEL_TELEMEGRAM_MESSAGES_ENDPOINT, response.status_code,
+                           len(response.content))
         response.raise_for_status()
         data = response.json()
         return data
@@ -289,12 +293,25 @@ def get_sentiment_analysis():
 
 
 def run_cron_job():
+    tracing.start_run()
+    try:
+        with span("run"):
+            run_pipeline()
+    finally:
+        tracing.finish_run({"response_cache": dict(response_cache.stats)})
+
+
+def run_pipeline():
     logging.info("Starting cron job...")
     detector = PumpDetector()
-    results = detector.analyze_coins()
+    try:
+        results = detector.analyze_coins()
+    finally:
+        detector.close()
     sentiment = get_sentiment_analysis()
     logging.info("Cron job finished. Results: %s", results)
     logging.info("Sentiment analysis: %s", sentiment)
+    logging.info("Response cache: %s", dict(response_cache.stats))
     analysis = sentiment.get("analysis")
     is_pump_and_dump = analysis.get("is_pump_and_dump", False)
     sentiment_summary = analysis.get("summary", "No sentiment summary provided.")
@@ -310,10 +327,11 @@ Write a short and concize engaging, insightful blog about it , make sure you mak
         logging.info("Generated prompt for Mistral: %s", prompt)
         
         try:
-            llm_response = llm.chat.complete(
-                model=MISTRAL_MODEL_NAME,
-                messages=[{"role": "user", "content": prompt}],
-            )
+            with span("blog_llm"):
+                llm_response = llm.chat.complete(
+                    model=MISTRAL_MODEL_NAME,
+                    messages=[{"role": "user", "content": prompt}],
+                )
             blog_text = llm_response.choices[0].message.content
             logging.info("Generated blog text: %s", blog_text)
         except Exception as e:
@@ -321,7 +339,9 @@ Write a short and concize engaging, insightful blog about it , make sure you mak
             return
         
         try:
-            blogger_response = requests.post(AI_BLOGGER_ENDPOINT, json={"blog_text": blog_text}, timeout=20)
+            with span("blog_post"):
+                blogger_response = requests.post(AI_BLOGGER_ENDPOINT, json={"blog_text": blog_text}, timeout=20)
+                record_request(AI_BLOGGER_ENDPOINT, blogger_response.status_code, len(blogger_response.content))
             blogger_response.raise_for_status()
             logging.info("Blog sent successfully via blogger API.")
         except Exception as e:
@@ -331,8 +351,9 @@ Write a short and concize engaging, insightful blog about it , make sure you mak
 
 
 if __name__ == "__main__":
+    tracing.serve_metrics()
     run_cron_job()
-    schedule.every(4).hours.do(run_cron_job)
+    schedule.every(RUN_INTERVAL_MINUTES).minutes.do(run_cron_job)
     logging.info("Cron scheduler started. Waiting for the next scheduled run...")
     while True:
         schedule.run_pending()
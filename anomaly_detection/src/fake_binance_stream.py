@@ -0,0 +1,90 @@
+import json
+import time
+import asyncio
+import argparse
+from typing import List
+import numpy as np
+from aiohttp import web
+
+
+# Replays a recorded aggTrade file as a Binance combined stream, paced by `speed`.
+
+def write_synthetic_recording(path: str, symbols: List[str], minutes: int = 10, trades_per_minute: int = 120,
+                              pump_symbol: str = None, pump_minute: int = 5, seed: int = 0):
+    """Writes a recording of random-walk trades; `pump_symbol` gets a +30% run from `pump_minute` on."""
+    rng = np.random.default_rng(seed)
+    start = int(time.time() * 1000) // 60000 * 60000
+    events = []
+    for symbol in symbols:
+        n = minutes * trades_per_minute
+        times = start + np.sort(rng.integers(0, minutes * 60000, n))
+        returns = rng.normal(0, 5e-4, n)
+        quantities = rng.exponential(10, n)
+        if symbol == pump_symbol:
+            pumping = times >= start + pump_minute * 60000
+            returns[pumping] += np.log(1.3) / max(int(pumping.sum()), 1)
+            quantities[pumping] *= 8
+        prices = np.exp(np.cumsum(returns))
+        for i in range(n):
+            events.append({"e": "aggTrade", "E": int(times[i]), "s": symbol, "a": i, "p": f"{prices[i]:.8f}",
+                           "q": f"{quantities[i]:.4f}", "f": i, "l": i, "T": int(times[i]),
+                           "m": bool(rng.integers(0, 2)), "M": True})
+    events.sort(key=lambda event: event["T"])
+    with open(path, "w") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def load_recording(path: str) -> List[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def make_app(events: List[dict], speed: float = 1.0) -> web.Application:
+    async def stream(request):
+        symbols = {s.split("@")[0].upper() for s in request.query.get("streams", "").split("/") if s}
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        selected = [event for event in events if event["s"] in symbols]
+        if selected:
+            offset = int(time.time() * 1000) - selected[0]["T"]
+            started = time.monotonic()
+            for event in selected:
+                delay = (event["T"] - selected[0]["T"]) / 1000 / speed - (time.monotonic() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # Shift by the replay speed too, so the replayed trades keep their spacing in stream time
+                shifted = selected[0]["T"] + offset + int((event["T"] - selected[0]["T"]) / speed)
+                data = {**event, "E": shifted, "T": shifted}
+                await ws.send_str(json.dumps({"stream": f"{event['s'].lower()}@aggTrade", "data": data}))
+        await ws.close()
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/stream", stream)
+    return app
+
+
+async def start_fake_stream(events: List[dict], speed: float = 1.0, host: str = "127.0.0.1", port: int = 0):
+    """Starts the stand-in on the running loop and returns (runner, base_url)."""
+    runner = web.AppRunner(make_app(events, speed))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"ws://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded aggTrades over a local websocket")
+    parser.add_argument("recording", help="JSON lines file of aggTrade events")
+    parser.add_argument("--port", type=int, default=8920)
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--synthetic", nargs="+", default=None,
+                        help="Write a synthetic recording for these symbols first")
+    parser.add_argument("--pump", default=None, help="Symbol of the synthetic recording that gets pumped")
+    args = parser.parse_args()
+    if args.synthetic:
+        write_synthetic_recording(args.recording, args.synthetic, pump_symbol=args.pump)
+    print(f"Fake Binance stream on ws://0.0.0.0:{args.port}/stream")
+    web.run_app(make_app(load_recording(args.recording), args.speed), port=args.port, print=None)
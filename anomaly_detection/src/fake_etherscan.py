@@ -0,0 +1,111 @@
+import json
+import time
+import zlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+# Serves Etherscan `tokentx` and `getblocknobytime` from deterministic synthetic blocks.
+
+GENESIS_TIMESTAMP = 1438269973
+BLOCK_SECONDS = 12
+MAX_RESULTS = 10000
+
+
+def block_timestamp(block: int) -> int:
+    return GENESIS_TIMESTAMP + block * BLOCK_SECONDS
+
+
+def block_by_time(timestamp: int, closest: str) -> int:
+    block, remainder = divmod(timestamp - GENESIS_TIMESTAMP, BLOCK_SECONDS)
+    return block + 1 if closest == "after" and remainder else block
+
+
+def synthetic_transfers(contract: str, block: int, per_block: int = None) -> list:
+    seed = zlib.crc32(f"{contract.lower()}:{block}".encode())
+    count = seed % 4 if per_block is None else per_block
+    return [{
+        "blockNumber": str(block),
+        "timeStamp": str(block_timestamp(block)),
+        "hash": f"0x{seed:08x}{block:016x}{i:040x}",
+        "from": f"0x{(seed + i) % 2**160:040x}",
+        "to": f"0x{(seed * 31 + i) % 2**160:040x}",
+        "value": str((seed % 1000 + i + 1) * 10**15),
+        "contractAddress": contract.lower(),
+        "tokenDecimal": "18"
+    } for i in range(count)]
+
+
+class FakeEtherscanHandler(BaseHTTPRequestHandler):
+    transfers_per_block = None
+    request_log = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.request_log.append((url.path, params))
+        if url.path != "/api":
+            return self._send(404, {"status": "0", "message": "Not found", "result": None})
+        latest = block_by_time(int(time.time()), "before")
+        action = (params.get("module"), params.get("action"))
+
+        if action == ("block", "getblocknobytime"):
+            timestamp = int(params["timestamp"])
+            if timestamp > time.time():
+                return self._send(200, {"status": "0", "message": "NOTOK", "result": "Error! No closest block found"})
+            return self._send(200, {"status": "1", "message": "OK",
+                                    "result": str(block_by_time(timestamp, params.get("closest", "before")))})
+
+        if action == ("account", "tokentx"):
+            page = int(params.get("page", 1))
+            offset = int(params.get("offset", MAX_RESULTS))
+            if page * offset > MAX_RESULTS:
+                return self._send(200, {"status": "0", "message": "NOTOK",
+                                        "result": "Result window is too large, PageNo x Offset size must be less "
+                                                  "than or equal to 10000"})
+            skip = (page - 1) * offset
+            end_block = min(int(params.get("endblock", latest)), latest)
+            block = int(params.get("startblock", 0))
+            result = []
+            while block <= end_block and len(result) < skip + offset:
+                result.extend(synthetic_transfers(params["contractaddress"], block, self.transfers_per_block))
+                block += 1
+            result = result[skip:skip + offset]
+            if not result:
+                return self._send(200, {"status": "0", "message": "No transactions found", "result": []})
+            return self._send(200, {"status": "1", "message": "OK", "result": result})
+
+        self._send(200, {"status": "0", "message": "NOTOK", "result": "Error! Missing Or invalid Module name"})
+
+    def _send(self, status: int, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_etherscan(host: str = "127.0.0.1", port: int = 0, transfers_per_block: int = None):
+    """Starts the stand-in on a background thread and returns (server, api_url)."""
+    handler = type("Handler", (FakeEtherscanHandler,), {"transfers_per_block": transfers_per_block,
+                                                        "request_log": []})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/api"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve synthetic Etherscan token transfers locally")
+    parser.add_argument("--port", type=int, default=8910)
+    parser.add_argument("--transfers-per-block", type=int, default=None)
+    args = parser.parse_args()
+    handler = type("Handler", (FakeEtherscanHandler,), {"transfers_per_block": args.transfers_per_block})
+    server = ThreadingHTTPServer(("0.0.0.0", args.port), handler)
+    print(f"Fake Etherscan API on http://0.0.0.0:{args.port}/api")
+    server.serve_forever()
@@ -0,0 +1,163 @@
+import os
+import io
+import glob
+import uuid
+import argparse
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+
+FEATURE_STORE_PATH = os.environ.get("FEATURE_STORE_PATH", "feature_store")
+
+COLUMNS = ["ts", "symbol", "features", "raw", "prediction", "probability"]
+
+
+def _day(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _to_epoch(value) -> Optional[int]:
+    """Epoch seconds from None, a number or an ISO date string (UTC)."""
+    if value is None or isinstance(value, (int, float, np.integer)):
+        return value
+    parsed = datetime.fromisoformat(value)
+    return int((parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)).timestamp())
+
+
+class FeatureStore:
+    """
+    Columnar store of the per-coin features, raw window summaries and model
+    verdicts of every run, partitioned by UTC day.
+
+    Each run appends one immutable `.npz` part to its day's directory; parts of
+    past days are compacted into a single file. Range queries only open the
+    day partitions that overlap the range. Features are in `feature_names`
+    order, raw summaries in `raw_names` order with NaN where a value was not
+    collected, and predictions are -1 when the model was not reached.
+    """
+
+    def __init__(self, path: str = FEATURE_STORE_PATH, feature_names: Sequence[str] = (),
+                 raw_names: Sequence[str] = ()):
+        self.path = path
+        self.feature_names = list(feature_names)
+        self.raw_names = list(raw_names)
+        os.makedirs(path, exist_ok=True)
+
+    def append(self, ts: int, symbols: List[str], features: np.ndarray, raw: np.ndarray,
+               predictions: Sequence[int], probabilities: Sequence[float]) -> str:
+        day_dir = os.path.join(self.path, _day(ts))
+        os.makedirs(day_dir, exist_ok=True)
+        n = len(symbols)
+        buffer = io.BytesIO()
+        np.savez(buffer,
+                 ts=np.full(n, ts, dtype=np.int64),
+                 symbol=np.array(symbols, dtype=str),
+                 features=np.asarray(features, dtype=np.float64).reshape(n, len(self.feature_names)),
+                 raw=np.asarray(raw, dtype=np.float64).reshape(n, len(self.raw_names)),
+                 prediction=np.asarray(predictions, dtype=np.int8),
+                 probability=np.asarray(probabilities, dtype=np.float64),
+                 feature_names=np.array(self.feature_names, dtype=str),
+                 raw_names=np.array(self.raw_names, dtype=str))
+        path = os.path.join(day_dir, f"part-{ts}-{uuid.uuid4().hex[:8]}.npz")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, path)
+        self.compact_before(_day(ts))
+        return path
+
+    def days(self) -> List[str]:
+        return sorted(d for d in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, d)))
+
+    def compact(self, day: str):
+        """Merges the parts of a day into one file."""
+        parts = sorted(glob.glob(os.path.join(self.path, day, "*.npz")))
+        if len(parts) < 2:
+            return
+        merged = self._load(parts)
+        buffer = io.BytesIO()
+        np.savez(buffer, **merged, feature_names=np.array(self.feature_names, dtype=str),
+                 raw_names=np.array(self.raw_names, dtype=str))
+        path = os.path.join(self.path, day, f"day-{day}.npz")
+        with open(path + ".tmp", "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(path + ".tmp", path)
+        for part in parts:
+            if part != path:
+                os.remove(part)
+
+    def compact_before(self, day: str):
+        for past_day in self.days():
+            if past_day < day:
+                self.compact(past_day)
+
+    def _load(self, files: List[str]) -> Dict[str, np.ndarray]:
+        loaded = []
+        for file in files:
+            with np.load(file) as part:
+                if self.feature_names and list(part["feature_names"]) != self.feature_names:
+                    raise ValueError(f"{file} holds features {list(part['feature_names'])}, "
+                                     f"expected {self.feature_names}")
+                loaded.append({column: part[column] for column in COLUMNS})
+        if not loaded:
+            return {
+                "ts": np.empty(0, dtype=np.int64), "symbol": np.empty(0, dtype=str),
+                "features": np.empty((0, len(self.feature_names))), "raw": np.empty((0, len(self.raw_names))),
+                "prediction": np.empty(0, dtype=np.int8), "probability": np.empty(0)
+            }
+        return {column: np.concatenate([part[column] for part in loaded]) for column in COLUMNS}
+
+    def query(self, symbols: Optional[Sequence[str]] = None, start=None, end=None) -> Dict[str, np.ndarray]:
+        """Rows with `start <= ts <= end` (epoch seconds or ISO dates), optionally for some symbols, by time."""
+        start, end = _to_epoch(start), _to_epoch(end)
+        first_day = _day(start) if start is not None else None
+        last_day = _day(end) if end is not None else None
+        files = [file for day in self.days()
+                 if (first_day is None or day >= first_day) and (last_day is None or day <= last_day)
+                 for file in sorted(glob.glob(os.path.join(self.path, day, "*.npz")))]
+        rows = self._load(files)
+        mask = np.ones(len(rows["ts"]), dtype=bool)
+        if start is not None:
+            mask &= rows["ts"] >= start
+        if end is not None:
+            mask &= rows["ts"] <= end
+        if symbols is not None:
+            mask &= np.isin(rows["symbol"], list(symbols))
+        order = np.argsort(rows["ts"][mask], kind="stable")
+        return {column: values[mask][order] for column, values in rows.items()}
+
+    def latest(self, since: int) -> Dict[str, Dict]:
+        """The newest row of every symbol written at or after `since`."""
+        rows = self.query(start=since)
+        latest = {}
+        for i in range(len(rows["ts"])):
+            latest[str(rows["symbol"][i])] = {column: rows[column][i] for column in COLUMNS}
+        return latest
+
+    def training_matrix(self, start=None, end=None, symbols: Optional[Sequence[str]] = None, scored_only: bool = True):
+        """(X, y) for retraining: features as float32 in `feature_names` order and the model verdicts."""
+        rows = self.query(symbols, start, end)
+        keep = rows["prediction"] >= 0 if scored_only else np.ones(len(rows["ts"]), dtype=bool)
+        return rows["features"][keep].astype(np.float32), rows["prediction"][keep]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the collected PnD feature store")
+    parser.add_argument("command", choices=["query", "export"])
+    parser.add_argument("--path", default=FEATURE_STORE_PATH)
+    parser.add_argument("--symbols", nargs="+", default=None)
+    parser.add_argument("--start", default=None, help="ISO date or time (UTC)")
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--output", default="training_matrix.npz")
+    args = parser.parse_args()
+    store = FeatureStore(args.path)
+    if args.command == "query":
+        rows = store.query(args.symbols, args.start, args.end)
+        for i in range(len(rows["ts"])):
+            print(datetime.fromtimestamp(int(rows["ts"][i]), timezone.utc).isoformat(), rows["symbol"][i],
+                  int(rows["prediction"][i]), np.round(rows["features"][i], 6).tolist())
+    else:
+        X, y = store.training_matrix(args.start, args.end, args.symbols)
+        np.savez(args.output, X=X, y=y)
+        print(f"Wrote {len(X)} rows to {args.output}")
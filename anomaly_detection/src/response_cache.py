@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from collections import Counter
+from typing import Callable, Dict, Optional
+import requests
+
+from tracing import record_request
+
+
+CACHE_DIR = os.environ.get("RESPONSE_CACHE_DIR", "response_cache")
+
+
+def cache_key(url: str, params: Optional[Dict] = None) -> str:
+    """Stable key for a GET: the URL plus its sorted query parameters."""
+    canonical = json.dumps([url, sorted((params or {}).items())], default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _write_atomic(path: str, payload: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+class ResponseCache:
+    """
+    On-disk cache of JSON GET responses with a TTL chosen per call.
+
+    A fresh entry is served without any request. An expired entry is
+    revalidated with If-None-Match / If-Modified-Since when the server sent an
+    ETag or Last-Modified; a 304 renews it without downloading the body again.
+    If the upstream fails, an expired entry is served rather than nothing.
+
+    `derived` caches a value computed from responses (e.g. the Binance pair
+    set) as a small JSON document of its own, so a hit skips decoding the
+    large response it was built from.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, session: Optional[requests.Session] = None):
+        self.directory = directory
+        self.session = session or requests.Session()
+        self.stats = Counter()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key: str):
+        base = os.path.join(self.directory, key)
+        return f"{base}.meta.json", f"{base}.body"
+
+    def _read_meta(self, key: str) -> Optional[Dict]:
+        meta_path, body_path = self._paths(key)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _read_body(self, key: str):
+        with open(self._paths(key)[1], "rb") as f:
+            return json.loads(f.read())
+
+    def _store(self, key: str, meta: Dict, body: Optional[bytes] = None):
+        meta_path, body_path = self._paths(key)
+        if body is not None:
+            _write_atomic(body_path, body)
+        _write_atomic(meta_path, json.dumps(meta).encode())
+
+    def get_json(self, url: str, ttl: float, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                 timeout: float = 30):
+        """GETs `url` as JSON through the cache. Headers (API keys) are not part of the key."""
+        key = cache_key(url, params)
+        meta = self._read_meta(key)
+        now = time.time()
+        if meta and now - meta["fetched_at"] < ttl:
+            self.stats["hits"] += 1
+            return self._read_body(key)
+
+        request_headers = dict(headers or {})
+        if meta and meta.get("etag"):
+            request_headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            request_headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            response = self.session.get(url, params=params, headers=request_headers, timeout=timeout)
+            record_request(url, response.status_code, len(response.content))
+            if response.status_code == 304 and meta:
+                self.stats["revalidated"] += 1
+                self._store(key, {**meta, "fetched_at": now})
+                return self._read_body(key)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            if meta is None:
+                raise
+            self.stats["stale"] += 1
+            logging.warning(f"Serving stale cache entry for {url}: {str(e)}")
+            return self._read_body(key)
+
+        self.stats["misses"] += 1
+        data = response.json()
+        self._store(key, {
+            "url": url,
+            "fetched_at": now,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified")
+        }, response.content)
+        return data
+
+    def derived(self, name: str, ttl: float, build: Callable):
+        """Returns the JSON-serialisable value `build()` computes, cached under `name` for `ttl` seconds."""
+        key = cache_key(f"derived:{name}")
+        meta = self._read_meta(key)
+        if meta and time.time() - meta["fetched_at"] < ttl:
+            self.stats["derived_hits"] += 1
+            return self._read_body(key)
+        self.stats["derived_misses"] += 1
+        value = build()
+        self._store(key, {"url": f"derived:{name}", "fetched_at": time.time()}, json.dumps(value).encode())
+        return value
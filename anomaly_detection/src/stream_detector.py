@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+from collections import deque
+from typing import Callable, Dict, List, Optional
+import aiohttp
+import numpy as np
+
+from data_collector import PumpDetector, is_valid_erc20
+from trade_stats import TRADE_DTYPE, TradeFeatureAccumulator
+
+
+BINANCE_STREAM_URL = os.environ.get("BINANCE_STREAM_URL", "wss://stream.binance.com:9443")
+# Binance accepts up to 1024 streams per connection; smaller shards reconnect faster
+STREAMS_PER_CONNECTION = 200
+
+WINDOW_MINUTES = 60
+EVALUATION_SECONDS = 60
+PRICE_JUMP_THRESHOLD = float(os.environ.get("PRICE_JUMP_THRESHOLD", 0.05))
+VOLUME_SPIKE_FACTOR = float(os.environ.get("VOLUME_SPIKE_FACTOR", 5.0))
+TRIP_COOLDOWN_SECONDS = 60
+TX_REFRESH_SECONDS = 300
+WATCHLIST_REFRESH_SECONDS = 3600
+
+
+class SymbolWindow:
+    """
+    Sliding window of one symbol's trades in bounded memory.
+
+    Closed minutes are kept as a ring of `minutes` accumulator states (one row
+    of running moments each), so the window features are exact whatever the
+    trade rate. Trades of the open minute are staged in a small array and
+    folded into its accumulator in vectorized batches.
+    """
+
+    def __init__(self, minutes: int = WINDOW_MINUTES, staging: int = 512):
+        self.minutes = minutes
+        self.states = np.full((minutes, 14), np.nan)
+        self.state_minutes = np.full(minutes, -1, dtype=np.int64)
+        self.staging = np.zeros(staging, dtype=TRADE_DTYPE)
+        self.staged = 0
+        self.current_minute = None
+        self.current = TradeFeatureAccumulator()
+        self.first_trade_time = None
+        # Trip-wire state, reset whenever the symbol is evaluated
+        self.reference_price = None
+        self.interval_volume = 0.0
+        self.baseline_volume = 0.0
+
+    def add(self, trade_id: int, trade_time: int, price: float, quantity: float, buyer_is_maker: bool):
+        minute = trade_time // 60000
+        if self.current_minute is None:
+            self.current_minute = minute
+            self.first_trade_time = trade_time
+        elif minute > self.current_minute:
+            self.close_minute(minute)
+        self.staging[self.staged] = (trade_id, trade_time, price, quantity, buyer_is_maker)
+        self.staged += 1
+        if self.staged == len(self.staging):
+            self.flush()
+        self.interval_volume += quantity
+        if self.reference_price is None:
+            self.reference_price = price
+
+    def flush(self):
+        if self.staged:
+            self.current.add_trades(self.staging[:self.staged])
+            self.staged = 0
+
+    def close_minute(self, next_minute: int):
+        self.flush()
+        if self.current.count:
+            slot = self.current_minute % self.minutes
+            self.states[slot] = self.current.state()
+            self.state_minutes[slot] = self.current_minute
+        self.current = TradeFeatureAccumulator(last_price=self.current.last_price)
+        self.current_minute = next_minute
+
+    def accumulator(self, now_ms: int) -> TradeFeatureAccumulator:
+        """The window ending at `now_ms`, merged oldest minute first."""
+        now_minute = now_ms // 60000
+        if self.current_minute is not None and now_minute > self.current_minute:
+            self.close_minute(now_minute)
+        self.flush()
+        window = TradeFeatureAccumulator()
+        live = np.flatnonzero(self.state_minutes > now_minute - self.minutes)
+        for slot in live[np.argsort(self.state_minutes[live])]:
+            window.merge(TradeFeatureAccumulator.from_state(self.states[slot]))
+        window.merge(self.current)
+        return window
+
+    def tripped(self, price: float) -> bool:
+        jumped = self.reference_price and abs(price / self.reference_price - 1) > PRICE_JUMP_THRESHOLD
+        spiked = self.baseline_volume > 0 and self.interval_volume > VOLUME_SPIKE_FACTOR * self.baseline_volume
+        return bool(jumped or spiked)
+
+    def reset_trip_wire(self, window: TradeFeatureAccumulator, now_ms: int):
+        self.reference_price = window.last_price
+        self.interval_volume = 0.0
+        # Mean traded quantity per evaluation interval over the part of the window seen so far
+        covered_seconds = min(self.minutes * 60, max(EVALUATION_SECONDS, (now_ms - self.first_trade_time) / 1000))
+        total_volume = window.volumes.count * window.volumes.mean
+        self.baseline_volume = total_volume * EVALUATION_SECONDS / covered_seconds
+
+
+class StreamDetector:
+    """
+    Long-running PnD detection over Binance aggTrade streams.
+
+    Every watched symbol has a `SymbolWindow`. All symbols are scored in one
+    batch request whenever an evaluation window closes; a symbol whose price
+    jumps or whose volume spikes since its last evaluation is scored right away
+    (at most once per cooldown). Rush-order features come from the incremental
+    Etherscan collector and are refreshed every TX_REFRESH_SECONDS.
+    """
+
+    def __init__(self, detector: PumpDetector, stream_url: str = BINANCE_STREAM_URL,
+                 on_alert: Optional[Callable[[Dict], None]] = None):
+        self.detector = detector
+        self.stream_url = stream_url
+        self.on_alert = on_alert or (lambda alert: logging.warning("PnD alert: %s", alert))
+        self.contracts: Dict[str, Optional[str]] = {}
+        self.windows: Dict[str, SymbolWindow] = {}
+        self.transaction_features: Dict[str, tuple] = {}
+        self.tripped = set()
+        self.tripped_event = asyncio.Event()
+        self.last_tripped: Dict[str, float] = {}
+        self.alerts = deque(maxlen=1000)
+        self.messages = 0
+
+    def watch(self, coins: List[Dict]):
+        """Sets the watched coins ({'binance_symbol', 'contract_address'}), keeping windows of those still watched."""
+        self.contracts = {coin['binance_symbol']: coin.get('contract_address') for coin in coins}
+        self.windows = {symbol: self.windows.get(symbol) or SymbolWindow() for symbol in self.contracts}
+        # State of symbols no longer watched would otherwise be scored against missing windows
+        self.tripped &= self.windows.keys()
+        if not self.tripped:
+            self.tripped_event.clear()
+        self.last_tripped = {s: t for s, t in self.last_tripped.items() if s in self.windows}
+        self.transaction_features = {s: f for s, f in self.transaction_features.items() if s in self.windows}
+
+    def watchlist_from_screener(self) -> List[Dict]:
+        coins = []
+        for coin in self.detector.get_risky_coins():
+            symbol = self.detector.get_binance_symbol(coin['symbol'])
+            if symbol:
+                coins.append({'binance_symbol': symbol, 'contract_address': coin['contract_address']})
+        return coins
+
+    def handle_trade(self, trade: Dict):
+        window = self.windows.get(trade['s'])
+        if window is None:
+            return
+        price = float(trade['p'])
+        window.add(trade['a'], trade['T'], price, float(trade['q']), trade['m'])
+        self.messages += 1
+        if window.tripped(price) and time.monotonic() - self.last_tripped.get(trade['s'], -np.inf) > TRIP_COOLDOWN_SECONDS:
+            self.last_tripped[trade['s']] = time.monotonic()
+            self.tripped.add(trade['s'])
+            self.tripped_event.set()
+
+    async def consume(self, session: aiohttp.ClientSession, symbols: List[str]):
+        """Keeps one combined-stream connection open for `symbols`, reconnecting with backoff."""
+        streams = "/".join(f"{symbol.lower()}@aggTrade" for symbol in symbols)
+        url = f"{self.stream_url}/stream?streams={streams}"
+        backoff = 1
+        while True:
+            try:
+                async with session.ws_connect(url, heartbeat=180) as ws:
+                    backoff = 1
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self.handle_trade(json.loads(msg.data)['data'])
+                        elif msg.type == aiohttp.WSMsgType.ERROR:
+                            break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.error(f"Trade stream error: {str(e)}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+    async def refresh_transaction_features(self, collector, symbols: List[str]):
+        now = time.monotonic()
+        stale = [s for s in symbols if is_valid_erc20(self.contracts.get(s))
+                 and now - self.transaction_features.get(s, (-np.inf, None))[0] > TX_REFRESH_SECONDS]
+        results = await asyncio.gather(*(collector.transaction_features(self.contracts[s]) for s in stale))
+        for symbol, features in zip(stale, results):
+            self.transaction_features[symbol] = (now, features)
+
+    async def score(self, collector, symbols: List[str], reason: str) -> List[Dict]:
+        now_ms = int(time.time() * 1000)
+        await self.refresh_transaction_features(collector, symbols)
+        rows, scored = [], []
+        for symbol in symbols:
+            window = self.windows[symbol].accumulator(now_ms)
+            if window.count == 0:
+                continue
+            collected = {**self.transaction_features.get(symbol, (0, {}))[1], **window.features()}
+            features = self.detector.build_features(collected)
+            rows.append(features)
+            scored.append({'symbol': symbol, 'features': features, 'reason': reason})
+            self.windows[symbol].reset_trip_wire(window, now_ms)
+        if not rows:
+            return []
+        try:
+            predictions, probabilities = await self.detector.score_features(collector, rows)
+        except Exception as e:
+            logging.error(f"PnD model request failed: {str(e)}")
+            return []
+        for result, prediction, probability in zip(scored, predictions, probabilities):
+            result['prediction'] = prediction
+            result['probability'] = probability
+            if prediction == 1:
+                self.alerts.append(result)
+                self.on_alert(result)
+        return scored
+
+    async def evaluate(self, collector):
+        """Scores every symbol when an evaluation window closes, and tripped symbols in between."""
+        next_close = time.monotonic() + EVALUATION_SECONDS
+        while True:
+            try:
+                await asyncio.wait_for(self.tripped_event.wait(), timeout=max(0.0, next_close - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+            # Cleared before reading `tripped`, so a set event never outlives the symbols it was set for
+            self.tripped_event.clear()
+            # A failed evaluation is logged and skipped; the loop must outlive it
+            if self.tripped:
+                symbols, self.tripped = sorted(self.tripped), set()
+                try:
+                    await self.score(collector, symbols, 'threshold')
+                except Exception as e:
+                    logging.error(f"Scoring tripped symbols {symbols} failed: {str(e)}")
+            if time.monotonic() >= next_close:
+                next_close += EVALUATION_SECONDS
+                try:
+                    results = await self.score(collector, list(self.windows), 'window')
+                    logging.info(f"Scored {len(results)} symbols, {self.messages} trades received")
+                except Exception as e:
+                    logging.error(f"Scoring the evaluation window failed: {str(e)}")
+
+    async def run(self, coins: Optional[List[Dict]] = None, refresh_seconds: float = WATCHLIST_REFRESH_SECONDS):
+        """Streams until cancelled. Without fixed `coins`, the watch list is re-screened every `refresh_seconds`."""
+        # Streams get their own session: the collector's has a total request timeout
+        async with self.detector.new_collector() as collector, aiohttp.ClientSession() as stream_session:
+            while True:
+                self.watch(coins if coins is not None else await asyncio.to_thread(self.watchlist_from_screener))
+                symbols = list(self.windows)
+                logging.info(f"Streaming {len(symbols)} symbols")
+                tasks = [asyncio.create_task(self.consume(stream_session, symbols[i:i + STREAMS_PER_CONNECTION]))
+                         for i in range(0, len(symbols), STREAMS_PER_CONNECTION)]
+                tasks.append(asyncio.create_task(self.evaluate(collector)))
+                try:
+                    if coins is not None:
+                        await asyncio.gather(*tasks)
+                    await asyncio.sleep(refresh_seconds)
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Real-time pump-and-dump detection over Binance trade streams")
+    parser.add_argument("--symbols", nargs="+", default=None, help="Binance symbols to watch instead of screening")
+    args = parser.parse_args()
+    detector = PumpDetector()
+    coins = [{'binance_symbol': symbol.upper(), 'contract_address': None} for symbol in args.symbols] \
+        if args.symbols else None
+    try:
+        asyncio.run(StreamDetector(detector).run(coins))
+    finally:
+        detector.close()
@@ -0,0 +1,28 @@
+import warnings
+import numpy as np
+
+from coin_screener import listing_columns, risk_scores, screen
+
+
+def listing(symbol, market_cap=None, volume_24h=None, num_market_pairs=None, date_added=None):
+    return {'symbol': symbol, 'num_market_pairs': num_market_pairs, 'date_added': date_added,
+            'platform': {'token_address': f"0x{symbol.lower()}"},
+            'quote': {'USD': {'market_cap': market_cap, 'volume_24h': volume_24h}}}
+
+
+def test_listing_without_data_is_not_scored_as_riskiest():
+    coins = [
+        listing('EMPTY'),
+        listing('SMALL', market_cap=1e5, volume_24h=5e4, num_market_pairs=1, date_added='2024-01-01T00:00:00.000Z'),
+        listing('LARGE', market_cap=1e11, volume_24h=1e9, num_market_pairs=500, date_added='2015-01-01T00:00:00.000Z')
+    ]
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        scored = risk_scores(listing_columns(coins), np.datetime64('2024-06-01T00:00:00', 'ms'))
+
+    assert np.isnan(scored['age_days'][0])
+    assert scored['score'][0] == 0.0
+    assert not scored['candidate'][0]
+    assert scored['candidate'][1] and not scored['candidate'][2]
+    assert scored['score'][1] > scored['score'][2]
+    assert [coin['symbol'] for coin in screen(coins, top_k=3)] == ['SMALL']
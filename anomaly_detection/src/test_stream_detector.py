@@ -0,0 +1,50 @@
+import asyncio
+
+
+def trade(symbol, trade_id, price, quantity=1.0, trade_time=1_700_000_000_000):
+    return {'s': symbol, 'a': trade_id, 'T': trade_time, 'p': str(price), 'q': str(quantity), 'm': False}
+
+
+def test_unwatching_a_tripped_symbol_does_not_spin_evaluate(tmp_path, monkeypatch):
+    # The collector modules create their stores in the working directory on import
+    monkeypatch.chdir(tmp_path)
+    import stream_detector
+
+    async def scenario():
+        detector = stream_detector.StreamDetector(detector=None)
+        detector.watch([{'binance_symbol': 'AUSDT'}, {'binance_symbol': 'BUSDT'}])
+        detector.handle_trade(trade('AUSDT', 1, 100.0))
+        detector.handle_trade(trade('AUSDT', 2, 110.0))
+        assert detector.tripped == {'AUSDT'}
+        assert detector.tripped_event.is_set()
+
+        detector.watch([{'binance_symbol': 'BUSDT'}])
+        assert detector.tripped == set()
+        assert not detector.tripped_event.is_set()
+
+        wakeups = 0
+        wait = detector.tripped_event.wait
+
+        async def counting_wait():
+            nonlocal wakeups
+            wakeups += 1
+            return await wait()
+
+        detector.tripped_event.wait = counting_wait
+        scored = []
+
+        async def score(collector, symbols, reason):
+            scored.append((symbols, reason))
+            return []
+
+        detector.score = score
+        task = asyncio.create_task(detector.evaluate(None))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return wakeups, scored
+
+    wakeups, scored = asyncio.run(scenario())
+    # One wait until the evaluation window closes, not a busy loop
+    assert wakeups == 1
+    assert scored == []
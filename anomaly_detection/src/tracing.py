@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import logging
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from prometheus_client import Counter, Histogram, start_http_server
+
+
+RUN_REPORT_DIR = os.environ.get("RUN_REPORT_DIR", "run_reports")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 5060))
+
+STAGE_SECONDS = Histogram("anomaly_stage_seconds", "Duration of a collector stage", ["stage"],
+                          buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600))
+HTTP_REQUESTS = Counter("anomaly_http_requests_total", "Upstream HTTP requests", ["host", "status"])
+HTTP_BYTES = Counter("anomaly_http_bytes_total", "Bytes downloaded from upstreams", ["host"])
+HTTP_RETRIES = Counter("anomaly_http_retries_total", "Upstream requests retried", ["host"])
+
+
+class Span:
+    """One timed stage. Request, byte and retry counts are those made directly inside it."""
+
+    def __init__(self, name: str, parent: Optional["Span"], attrs: Dict):
+        self.name = name
+        self.parent = parent
+        # Attributes such as the coin are inherited, so nested stages are attributed to it
+        self.attrs = {**(parent.attrs if parent else {}), **attrs}
+        self.started_at = time.time()
+        self.duration = None
+        self.requests = 0
+        self.bytes = 0
+        self.retries = 0
+        self.error = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "attrs": self.attrs,
+            "started_at": self.started_at,
+            "duration_s": self.duration,
+            "requests": self.requests,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "error": self.error
+        }
+
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_run_spans: Optional[List[Span]] = None
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Times the enclosed block as stage `name`. Works across awaits: every
+    asyncio task gets its own copy of the current span, so concurrent coins
+    keep separate breakdowns.
+    """
+    current = Span(name, _current_span.get(), attrs)
+    token = _current_span.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)[:200]
+        raise
+    finally:
+        current.duration = time.perf_counter() - start
+        _current_span.reset(token)
+        STAGE_SECONDS.labels(name).observe(current.duration)
+        if _run_spans is not None:
+            _run_spans.append(current)
+
+
+def record_request(url: str, status, nbytes: int = 0, retries: int = 0):
+    """Accounts one upstream request to the current span and the metrics."""
+    host = urlparse(url).netloc
+    HTTP_REQUESTS.labels(host, str(status)).inc()
+    HTTP_BYTES.labels(host).inc(nbytes)
+    if retries:
+        HTTP_RETRIES.labels(host).inc(retries)
+    current = _current_span.get()
+    if current is not None:
+        current.requests += 1
+        current.bytes += nbytes
+        current.retries += retries
+
+
+def start_run():
+    """Starts collecting the spans of a new run report."""
+    global _run_spans
+    _run_spans = []
+
+
+def finish_run(extra: Optional[Dict] = None, report_dir: str = RUN_REPORT_DIR) -> Dict:
+    """Builds the run report from the spans since `start_run`, writes it as JSON and returns it."""
+    global _run_spans
+    spans, _run_spans = _run_spans or [], None
+
+    stages = defaultdict(lambda: {"count": 0, "total_s": 0.0, "max_s": 0.0, "requests": 0, "bytes": 0,
+                                  "retries": 0, "errors": 0})
+    coins = defaultdict(lambda: defaultdict(lambda: {"seconds": 0.0, "requests": 0, "bytes": 0, "retries": 0}))
+    for s in spans:
+        stage = stages[s.name]
+        stage["count"] += 1
+        stage["total_s"] += s.duration
+        stage["max_s"] = max(stage["max_s"], s.duration)
+        stage["requests"] += s.requests
+        stage["bytes"] += s.bytes
+        stage["retries"] += s.retries
+        stage["errors"] += s.error is not None
+        if "coin" in s.attrs:
+            coin_stage = coins[s.attrs["coin"]][s.name]
+            coin_stage["seconds"] += s.duration
+            coin_stage["requests"] += s.requests
+            coin_stage["bytes"] += s.bytes
+            coin_stage["retries"] += s.retries
+
+    started_at = min((s.started_at for s in spans), default=time.time())
+    report = {
+        "started_at": datetime.fromtimestamp(started_at, timezone.utc).isoformat(),
+        "duration_s": max((s.started_at + s.duration for s in spans), default=started_at) - started_at,
+        "totals": {key: sum(s[key] for s in stages.values()) for key in ("requests", "bytes", "retries")},
+        "stages": dict(stages),
+        "coins": {coin: dict(breakdown) for coin, breakdown in coins.items()},
+        "spans": [s.to_dict() for s in sorted(spans, key=lambda s: s.started_at)],
+        **(extra or {})
+    }
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, f"run_{datetime.fromtimestamp(started_at, timezone.utc):%Y%m%dT%H%M%S}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    logging.info(f"Run report written to {path}")
+    return report
+
+
+def serve_metrics(port: int = METRICS_PORT):
+    """Exposes the stage histograms and request counters for Prometheus on /metrics."""
+    start_http_server(port)
+    logging.info(f"Metrics served on :{port}/metrics")
@@ -0,0 +1,133 @@
+from typing import Dict, List
+import numpy as np
+
+
+# One row per aggregate trade: id, time (ms), price, quantity and whether the
+# buyer was the maker
+TRADE_DTYPE = np.dtype([('a', 'i8'), ('T', 'i8'), ('p', 'f8'), ('q', 'f8'), ('m', '?')])
+
+
+def parse_trades(page: List[Dict]) -> np.ndarray:
+    """Parses an aggTrades page into a structured array in one pass."""
+    return np.fromiter(((t['a'], t['T'], t['p'], t['q'], t['m']) for t in page), dtype=TRADE_DTYPE, count=len(page))
+
+
+class RunningMoments:
+    """
+    Count, mean and sum of squared deviations (Welford's M2) of a stream.
+    Batches are folded in with Chan's parallel update, so each batch is reduced
+    with vectorized NumPy ops and nothing but these three numbers is kept.
+    """
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, values: np.ndarray):
+        if len(values) == 0:
+            return
+        batch_mean = float(np.mean(values))
+        batch_m2 = float(np.sum((values - batch_mean) ** 2))
+        self.merge(RunningMoments(len(values), batch_mean, batch_m2))
+
+    def merge(self, other: "RunningMoments"):
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.count = total
+
+    def std(self, ddof: int = 1) -> float:
+        return float(np.sqrt(self.m2 / (self.count - ddof))) if self.count > ddof else 0.0
+
+    def state(self) -> tuple:
+        return (self.count, self.mean, self.m2)
+
+
+class TradeFeatureAccumulator:
+    """
+    Computes the Binance market features of `get_market_features` page by page.
+    Memory stays constant whatever the number of trades in the window.
+    """
+
+    def __init__(self, last_price: float = None):
+        self.sides = RunningMoments()
+        self.volumes = RunningMoments()
+        self.prices = RunningMoments()
+        self.price_changes = RunningMoments()
+        self.max_price = -np.inf
+        self.last_price = last_price
+
+    def state(self) -> tuple:
+        """Flat tuple of the accumulator state, as stored by the cursor store."""
+        return (*self.sides.state(), *self.volumes.state(), *self.prices.state(),
+                *self.price_changes.state(), self.max_price, self.last_price)
+
+    @classmethod
+    def from_state(cls, state) -> "TradeFeatureAccumulator":
+        last_price = state[13]
+        accumulator = cls(last_price=None if last_price is None or np.isnan(last_price) else last_price)
+        accumulator.sides = RunningMoments(*state[0:3])
+        accumulator.volumes = RunningMoments(*state[3:6])
+        accumulator.prices = RunningMoments(*state[6:9])
+        accumulator.price_changes = RunningMoments(*state[9:12])
+        accumulator.max_price = state[12]
+        return accumulator
+
+    def merge(self, other: "TradeFeatureAccumulator"):
+        """Folds in the accumulator of a later, adjacent stretch of trades."""
+        self.sides.merge(other.sides)
+        self.volumes.merge(other.volumes)
+        self.prices.merge(other.prices)
+        self.price_changes.merge(other.price_changes)
+        self.max_price = max(self.max_price, other.max_price)
+        if other.last_price is not None:
+            self.last_price = other.last_price
+
+    def add_page(self, page: List[Dict]):
+        if page:
+            self.add_trades(parse_trades(page))
+
+    def add_trades(self, trades: np.ndarray):
+        if len(trades) == 0:
+            return
+        prices = trades['p']
+        self.sides.update(np.where(trades['m'], 1.0, -1.0))
+        self.volumes.update(trades['q'])
+        self.prices.update(prices)
+        # The first change of a page is measured against the last price of the previous one
+        previous = prices[:-1] if self.last_price is None else np.concatenate(([self.last_price], prices[:-1]))
+        current = prices if self.last_price is not None else prices[1:]
+        self.price_changes.update((current - previous) / previous)
+        self.max_price = max(self.max_price, float(prices.max()))
+        self.last_price = float(prices[-1])
+
+    @property
+    def count(self) -> int:
+        return self.prices.count
+
+    def features(self) -> Dict:
+        if self.count == 0:
+            return {}
+        return {
+            'trade_count': self.count,
+            'std_trades': self.sides.std(),
+            'std_volume': self.volumes.std(),
+            'avg_volume': self.volumes.mean,
+            'std_price': self.price_changes.std(),
+            'avg_price': self.prices.mean,
+            'avg_price_max': self.max_price
+        }
+
+
+def split_by_minute(trades: np.ndarray):
+    """Yields (minute, trades) runs of a time-ordered trades array."""
+    if len(trades) == 0:
+        return
+    minutes = trades['T'] // 60000
+    starts = np.flatnonzero(np.diff(minutes)) + 1
+    for chunk in np.split(trades, starts):
+        yield int(chunk['T'][0] // 60000), chunk
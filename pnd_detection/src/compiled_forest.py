@@ -0,0 +1,175 @@
+import os
+import time
+import pickle
+import argparse
+import numpy as np
+
+
+# Rows traversed per chunk: bounds the (trees x rows) working arrays at large batch sizes
+CHUNK_ROWS = 4096
+# Above this many rows sklearn's compiled tree loop wins over the array traversal, so the model scores them
+COMPILED_MAX_ROWS = int(os.environ.get("PND_COMPILED_MAX_ROWS", 256))
+
+
+class CompiledForest:
+    """
+    A fitted scikit-learn tree ensemble classifier flattened into contiguous
+    node arrays and evaluated for all trees and rows at once.
+
+    Mirrors `predict_proba` of the forest step for step, so results are
+    bit-identical: rows are cast to float32 like sklearn does before walking
+    the trees, each tree's leaf values are normalised to class fractions,
+    and the per-tree probabilities are summed in tree order before dividing
+    by the number of trees. Leaves point to themselves, so a traversal step
+    can be applied to every (tree, row) pair without branching; pairs that
+    reached a leaf are dropped from the active set.
+
+    The traversal removes sklearn's per-call validation and per-tree dispatch
+    overhead, which dominates small batches; batches above `max_rows` are
+    handed back to the forest itself.
+    """
+
+    def __init__(self, forest, max_rows: int = COMPILED_MAX_ROWS):
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output classifiers can be compiled")
+        self.forest = forest
+        self.max_rows = max_rows
+        self.classes_ = forest.classes_
+        self.n_classes = len(forest.classes_)
+        self.n_features_in_ = forest.n_features_in_
+        self.n_trees = len(trees)
+        self.max_depth = max(tree.max_depth for tree in trees)
+
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        self.roots = offsets[:-1].astype(np.intp)
+        self.feature = np.concatenate([tree.feature for tree in trees]).astype(np.intp)
+        self.is_leaf = np.concatenate([tree.children_left == -1 for tree in trees])
+        node_ids = np.arange(len(self.is_leaf))
+        left = np.concatenate([tree.children_left + offset for tree, offset in zip(trees, offsets)])
+        right = np.concatenate([tree.children_right + offset for tree, offset in zip(trees, offsets)])
+        # children[node, 0] is taken when the row goes left, children[node, 1] when it goes right
+        self.children = np.stack([np.where(self.is_leaf, node_ids, left),
+                                  np.where(self.is_leaf, node_ids, right)], axis=1).astype(np.intp).ravel()
+        self.feature[self.is_leaf] = 0
+
+        # sklearn compares the float32 row against a float64 threshold; for a float32 x,
+        # x <= t exactly when x <= the largest float32 not above t, so compare in float32
+        threshold = np.concatenate([tree.threshold for tree in trees])
+        self.threshold = threshold.astype(np.float32)
+        rounded_up = self.threshold.astype(np.float64) > threshold
+        self.threshold[rounded_up] = np.nextafter(self.threshold[rounded_up], np.float32(-np.inf))
+
+        # Leaf values as the class fractions a single tree's predict_proba returns
+        value = np.concatenate([tree.value[:, 0, :self.n_classes] for tree in trees]).astype(np.float64)
+        normalizer = value.sum(axis=1)
+        normalizer[normalizer == 0.0] = 1.0
+        self.value = value / normalizer[:, None]
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """The leaf every tree reaches for every row, shape (n_trees, n_rows)."""
+        n = len(X)
+        leaves = np.repeat(self.roots, n)
+        node = leaves.copy()
+        # Offset of each pair's row in the flattened X, and its position in `leaves`
+        row_offset = np.tile(np.arange(n, dtype=np.intp) * self.n_features_in_, self.n_trees)
+        position = np.arange(len(node))
+        flat_X = X.ravel()
+        step = 0
+        while len(node):
+            goes_right = flat_X[row_offset + self.feature[node]] > self.threshold[node]
+            node = self.children[2 * node + goes_right]
+            step += 1
+            # Pairs at a leaf stay put, so finished pairs are only dropped every few steps
+            if step % 4 == 0 or step >= self.max_depth:
+                done = self.is_leaf[node]
+                leaves[position[done]] = node[done]
+                running = ~done
+                node, row_offset, position = node[running], row_offset[running], position[running]
+        return leaves.reshape(self.n_trees, n)
+
+    def predict_proba(self, X) -> np.ndarray:
+        if len(X) > self.max_rows:
+            return self.forest.predict_proba(X)
+        return self.traverse_proba(X)
+
+    def traverse_proba(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32).reshape(-1, self.n_features_in_)
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity")
+        proba = np.empty((len(X), self.n_classes), dtype=np.float64)
+        for start in range(0, len(X), CHUNK_ROWS):
+            leaf_values = self.value[self.leaves(X[start:start + CHUNK_ROWS])]
+            chunk = np.zeros(leaf_values.shape[1:], dtype=np.float64)
+            for tree_values in leaf_values:
+                chunk += tree_values
+            proba[start:start + CHUNK_ROWS] = chunk / self.n_trees
+        return proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def compile_model(model):
+    """A CompiledForest for a fitted forest classifier, or the model itself when it is not one."""
+    if not hasattr(model, "estimators_") or not all(hasattr(e, "tree_") for e in model.estimators_):
+        return model
+    try:
+        return CompiledForest(model)
+    except ValueError:
+        return model
+
+
+def test_rows(forest, n: int, seed: int = 0) -> np.ndarray:
+    """Rows spread over each feature's split thresholds, including rows sitting exactly on them."""
+    rng = np.random.default_rng(seed)
+    X = np.empty((n, forest.n_features_in_))
+    for j in range(forest.n_features_in_):
+        thresholds = np.concatenate([e.tree_.threshold[e.tree_.feature == j] for e in forest.estimators_])
+        if len(thresholds) == 0:
+            thresholds = np.zeros(1)
+        spread = thresholds.max() - thresholds.min() or 1.0
+        X[:, j] = rng.uniform(thresholds.min() - 0.1 * spread, thresholds.max() + 0.1 * spread, n)
+        on_threshold = rng.random(n) < 0.1
+        X[on_threshold, j] = rng.choice(thresholds, on_threshold.sum())
+    return X
+
+
+def best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check and benchmark the compiled PnD forest against the pickled model")
+    parser.add_argument("--model", default="model.pkl")
+    parser.add_argument("--rows", type=int, default=200_000, help="rows of the equality check")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)
+    compiled = CompiledForest(model)
+
+    X = test_rows(model, args.rows)
+    same_proba = np.array_equal(model.predict_proba(X), compiled.traverse_proba(X))
+    traversed = model.classes_.take(np.argmax(compiled.traverse_proba(X), axis=1), axis=0)
+    same_predictions = np.array_equal(model.predict(X), traversed)
+    print(f"{args.rows} rows: predict_proba identical={same_proba} predict identical={same_predictions}")
+    if not (same_proba and same_predictions):
+        raise SystemExit(1)
+
+    print(f"{'batch':>8} {'sklearn ms':>11} {'traversal ms':>13} {'compiled ms':>12} {'sklearn rows/s':>15} "
+          f"{'compiled rows/s':>16}")
+    for size in args.sizes:
+        batch = X[:size] if size <= len(X) else test_rows(model, size, seed=1)
+        repeat = max(3, min(200, 20_000 // size))
+        reference = best_time(lambda: model.predict_proba(batch), repeat)
+        traversal = best_time(lambda: compiled.traverse_proba(batch), repeat)
+        fast = best_time(lambda: compiled.predict_proba(batch), repeat)
+        print(f"{size:>8} {reference * 1000:>11.3f} {traversal * 1000:>13.3f} {fast * 1000:>12.3f} "
+              f"{size / reference:>15.0f} {size / fast:>16.0f}")
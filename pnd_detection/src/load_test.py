@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+import numpy as np
+import aiohttp
+
+
+FEATURES = ["std_rush_order", "avg_rush_order", "std_trades", "std_volume", "avg_volume", "std_price",
+            "avg_price", "avg_price_max", "hour_sin", "hour_cos", "minute_sin", "minute_cos"]
+
+
+def start_server(port: int, batching: bool) -> subprocess.Popen:
+    env = {**os.environ, "PND_BATCHING": "1" if batching else "0"}
+    return subprocess.Popen([sys.executable, "-m", "uvicorn", "pnd_detection_model:app", "--port", str(port),
+                             "--log-level", "warning"], env=env)
+
+
+async def wait_ready(session: aiohttp.ClientSession, url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up")
+
+
+def json_bodies(requests: int, rows: int = 0):
+    """Request bodies for /predict (`rows=0`) or /predict/batch, as aiohttp keyword arguments."""
+    matrix = np.random.default_rng(0).normal(size=(requests, max(rows, 1), len(FEATURES))).tolist()
+    if rows == 0:
+        return [{"json": dict(zip(FEATURES, batch[0]))} for batch in matrix]
+    return [{"json": {"rows": [dict(zip(FEATURES, row)) for row in batch]}} for batch in matrix]
+
+
+def raw_bodies(requests: int, rows: int = 1):
+    """Request bodies for /predict/raw: `rows` float32 rows each."""
+    matrix = np.random.default_rng(0).normal(size=(requests, rows, len(FEATURES))).astype("<f4")
+    return [{"data": batch.tobytes(), "headers": {"Content-Type": "application/octet-stream"}} for batch in matrix]
+
+
+async def load(url: str, bodies, concurrency: int):
+    """Posts `bodies` from `concurrency` clients; returns (seconds, latencies, bytes sent, bytes received)."""
+    latencies = []
+    sent = received = 0
+    pending = iter(bodies)
+
+    async def client(session):
+        nonlocal sent, received
+        for body in pending:
+            start = time.perf_counter()
+            async with session.post(url, **body) as response:
+                content = await response.read()
+                response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            sent += len(body["data"]) if "data" in body else len(json.dumps(body["json"]))
+            received += len(content)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for body in bodies[:20]:
+            async with session.post(url, **body) as response:
+                await response.read()
+        start = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        return time.perf_counter() - start, np.array(latencies), sent, received
+
+
+async def run(port: int, requests: int, concurrency: int):
+    for batching in (False, True):
+        server = start_server(port, batching)
+        try:
+            async with aiohttp.ClientSession() as session:
+                await wait_ready(session, f"http://127.0.0.1:{port}/docs")
+            seconds, latencies, _, _ = await load(f"http://127.0.0.1:{port}/predict", json_bodies(requests),
+                                                  concurrency)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"batching={'on ' if batching else 'off'} concurrency={concurrency} "
+              f"throughput={len(latencies) / seconds:8.1f} req/s "
+              f"p50={np.percentile(latencies, 50) * 1000:7.1f} ms p99={np.percentile(latencies, 99) * 1000:7.1f} ms")
+
+
+async def compare_formats(port: int, requests: int, concurrency: int, batch_rows: int):
+    """JSON against the binary float32 format, for single rows and for `batch_rows`-row batches."""
+    base = f"http://127.0.0.1:{port}"
+    server = start_server(port, batching=True)
+    try:
+        async with aiohttp.ClientSession() as session:
+            await wait_ready(session, f"{base}/docs")
+        cases = [
+            ("json   1 row ", "/predict", json_bodies(requests), 1),
+            ("binary 1 row ", "/predict/raw", raw_bodies(requests), 1),
+            (f"json   {batch_rows} rows", "/predict/batch", json_bodies(requests // 10, batch_rows), batch_rows),
+            (f"binary {batch_rows} rows", "/predict/raw", raw_bodies(requests // 10, batch_rows), batch_rows)
+        ]
+        for name, path, bodies, rows in cases:
+            seconds, latencies, sent, received = await load(base + path, bodies, concurrency)
+            print(f"{name} concurrency={concurrency} rows/s={len(latencies) * rows / seconds:9.0f} "
+                  f"p50={np.percentile(latencies, 50) * 1000:7.1f} ms p99={np.percentile(latencies, 99) * 1000:7.1f} ms "
+                  f"bytes/row sent={sent / (len(latencies) * rows):6.1f} received={received / (len(latencies) * rows):5.1f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent PnD server load test")
+    parser.add_argument("mode", nargs="?", choices=["batching", "formats"], default="batching",
+                        help="batching: /predict with and without micro-batching; formats: JSON against binary")
+    parser.add_argument("--port", type=int, default=5041)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--batch-rows", type=int, default=1000)
+    args = parser.parse_args()
+    for concurrency in args.concurrency:
+        if args.mode == "batching":
+            asyncio.run(run(args.port, args.requests, concurrency))
+        else:
+            asyncio.run(compare_formats(args.port, args.requests, concurrency, args.batch_rows))
@@ -0,0 +1,79 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Callable, Tuple
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one matrix per model call.
+
+    Rows are queued by `submit`; a single consumer takes whatever is queued
+    (up to `max_batch_size`), scores it in `executor` so the event loop keeps
+    accepting requests, and resolves each row's future. Rows arriving during
+    inference form the next batch, so batches grow with load on their own.
+    The consumer only waits up to `max_wait` for more rows when the previous
+    batch held more than one; at low load a lone request is never delayed.
+    """
+
+    def __init__(self, score: Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]], executor: Executor,
+                 max_batch_size: int = 64, max_wait: float = 0.002):
+        self.score = score
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = None
+        self.batches = 0
+        self.rows = 0
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+
+    async def submit(self, row: np.ndarray):
+        """Scores one feature row; returns its (prediction, probability)."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((row, future))
+        return await future
+
+    async def _collect(self, busy: bool) -> list:
+        batch = [await self.queue.get()]
+        while len(batch) < self.max_batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if busy and self.max_wait > 0:
+            deadline = asyncio.get_running_loop().time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        busy = False
+        while True:
+            batch = await self._collect(busy)
+            busy = len(batch) > 1
+            futures = [future for _, future in batch]
+            try:
+                predictions, probabilities = await loop.run_in_executor(
+                    self.executor, self.score, np.vstack([row for row, _ in batch]))
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(batch)
+            for future, prediction, probability in zip(futures, predictions, probabilities):
+                # The client may have gone away while its row was queued
+                if not future.done():
+                    future.set_result((int(prediction), float(probability)))
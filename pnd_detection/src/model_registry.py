@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import pickle
+import shutil
+import asyncio
+import hashlib
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+from typing import Dict, NamedTuple, Optional
+import numpy as np
+
+from compiled_forest import compile_model
+
+
+MODEL_REGISTRY_DIR = os.environ.get("MODEL_REGISTRY_DIR", "models")
+# Model used while the registry holds no version yet
+FALLBACK_MODEL_PATH = os.environ.get("PND_MODEL_PATH", "model.pkl")
+MODEL_POLL_SECONDS = float(os.environ.get("MODEL_POLL_SECONDS", 30))
+N_FEATURES = 12
+
+
+class LoadedModel(NamedTuple):
+    version: str
+    model: object
+    # What requests are scored with: the compiled forest, or the model itself
+    predictor: object
+    sha256: str
+    meta: Dict
+    loaded_at: float
+    load_seconds: float
+
+
+def sha256_of(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, payload: bytes):
+    with open(path + ".tmp", "wb") as f:
+        f.write(payload)
+    os.replace(path + ".tmp", path)
+
+
+class ModelRegistry:
+    """
+    Directory of immutable, versioned PnD models with hot swapping.
+
+    Each version is a subdirectory holding `model.pkl`, a `meta.json` with
+    its sha256 and the predictions it gave for the registry's fixture rows
+    when it was published. `CURRENT` names the version to serve; when it is
+    absent, the most recently created version published with activation is
+    served, never one published with `activate=False`. A version is
+    checksummed, unpickled, compiled, warmed up and checked against the
+    fixtures off the serving path, then swapped in with a single
+    assignment; requests read `active` once, so each is scored entirely by
+    one model. A version that fails is not retried until a forced refresh,
+    and the previous model keeps serving.
+    """
+
+    def __init__(self, directory: str = MODEL_REGISTRY_DIR, fallback_path: str = FALLBACK_MODEL_PATH,
+                 compiled: bool = True):
+        self.directory = directory
+        self.fallback_path = fallback_path
+        self.compiled = compiled
+        self.active: Optional[LoadedModel] = None
+        self.previous_version = None
+        self.failed: Dict[str, str] = {}
+        self.refresh_lock = threading.Lock()
+        self.refresh_requested = None
+
+    def meta(self, version: str) -> Dict:
+        with open(os.path.join(self.directory, version, "meta.json")) as f:
+            return json.load(f)
+
+    def versions(self):
+        """Published versions, oldest first by creation time (names like v9 and v10 do not sort)."""
+        if not os.path.isdir(self.directory):
+            return []
+        # Staging directories of an ongoing publish are not versions yet
+        names = [d for d in os.listdir(self.directory)
+                 if not d.endswith(".tmp") and os.path.exists(os.path.join(self.directory, d, "meta.json"))]
+        return sorted(names, key=lambda name: (self.meta(name)["created_at"], name))
+
+    def current_version(self) -> Optional[str]:
+        """The version to serve, or None when only the fallback model is available."""
+        pointer = os.path.join(self.directory, "CURRENT")
+        if os.path.exists(pointer):
+            with open(pointer) as f:
+                return f.read().strip()
+        activated = [version for version in self.versions() if self.meta(version).get("activated", True)]
+        return activated[-1] if activated else None
+
+    def fixtures(self):
+        """The fixture rows and their file's checksum, or (None, None)."""
+        path = os.path.join(self.directory, "fixtures.npz")
+        if not os.path.exists(path):
+            return None, None
+        with np.load(path) as fixtures:
+            return fixtures["X"].astype(np.float64), sha256_of(path)
+
+    def load(self, version: Optional[str]) -> LoadedModel:
+        """Loads, warms up and validates a version (the fallback model for None); raises ValueError if it is unfit."""
+        start = time.perf_counter()
+        if version is None:
+            path, meta = self.fallback_path, {"version": None, "source": self.fallback_path}
+        else:
+            path = os.path.join(self.directory, version, "model.pkl")
+            meta = self.meta(version)
+        sha256 = sha256_of(path)
+        if version is not None and sha256 != meta["sha256"]:
+            raise ValueError(f"Checksum mismatch for {version}: {sha256} != {meta['sha256']}")
+        with open(path, "rb") as f:
+            model = pickle.load(f)
+        if getattr(model, "n_features_in_", N_FEATURES) != N_FEATURES:
+            raise ValueError(f"Model expects {model.n_features_in_} features, not {N_FEATURES}")
+        predictor = compile_model(model) if self.compiled else model
+
+        fixtures, fixtures_sha256 = self.fixtures()
+        rows = fixtures if fixtures is not None else np.random.default_rng(0).normal(size=(64, N_FEATURES))
+        # Warm-up at the batch sizes the server sees, so the first requests do not pay for it
+        for size in (1, min(64, len(rows)), len(rows)):
+            predictions = predictor.predict(rows[:size])
+        if len(predictions) != len(rows) or not set(np.unique(predictions)) <= set(model.classes_):
+            raise ValueError(f"Model gave unexpected predictions on {len(rows)} fixture rows")
+        expected = meta.get("fixture_predictions")
+        # Predictions published against other fixture rows cannot be compared
+        if expected is not None and fixtures_sha256 == meta.get("fixtures_sha256"):
+            mismatches = int(np.sum(predictions != np.asarray(expected)))
+            if mismatches:
+                raise ValueError(f"{version} disagrees with its published fixture predictions on {mismatches} rows")
+        return LoadedModel(version or os.path.basename(self.fallback_path), model, predictor, sha256, meta,
+                           time.time(), time.perf_counter() - start)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Swaps in the current version if it differs from the active one; returns whether it did."""
+        with self.refresh_lock:
+            version = self.current_version()
+            name = version or os.path.basename(self.fallback_path)
+            if self.active is not None and self.active.version == name:
+                return False
+            if name in self.failed and not force:
+                return False
+            try:
+                loaded = self.load(version)
+            except Exception as e:
+                self.failed[name] = str(e)
+                if self.active is None:
+                    raise
+                logging.error(f"Model {name} rejected, still serving {self.active.version}: {str(e)}")
+                return False
+            self.failed.pop(name, None)
+            self.previous_version = self.active.version if self.active else None
+            self.active = loaded
+            logging.info(f"Serving model {name} (loaded in {loaded.load_seconds:.2f}s)")
+            return True
+
+    async def watch(self, interval: float = MODEL_POLL_SECONDS):
+        """Polls for a new current version; `request_refresh` (SIGHUP) checks right away and retries failures."""
+        self.refresh_requested = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self.refresh_requested.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            force = self.refresh_requested.is_set()
+            self.refresh_requested.clear()
+            try:
+                await asyncio.to_thread(self.refresh, force)
+            except Exception as e:
+                logging.error(f"Model refresh failed: {str(e)}")
+
+    def request_refresh(self):
+        if self.refresh_requested is not None:
+            self.refresh_requested.set()
+
+    def status(self) -> Dict:
+        active = self.active
+        return {
+            "version": active.version,
+            "sha256": active.sha256,
+            "loaded_at": datetime.fromtimestamp(active.loaded_at, timezone.utc).isoformat(),
+            "load_seconds": round(active.load_seconds, 4),
+            "compiled": active.predictor is not active.model,
+            "meta": {key: value for key, value in active.meta.items() if key != "fixture_predictions"},
+            "previous_version": self.previous_version,
+            "rejected": self.failed
+        }
+
+    def publish(self, model_path: str, version: str, description: str = "", activate: bool = True) -> Dict:
+        """Adds `model_path` as a new immutable version, with its checksum and fixture predictions."""
+        version_dir = os.path.join(self.directory, version)
+        if os.path.exists(version_dir):
+            raise ValueError(f"Version {version} already exists")
+        with open(model_path, "rb") as f:
+            model = pickle.load(f)
+        fixtures, fixtures_sha256 = self.fixtures()
+        meta = {
+            "version": version,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "description": description,
+            "sha256": sha256_of(model_path),
+            "model_class": type(model).__name__,
+            "fixtures_sha256": fixtures_sha256,
+            # Versions published without activation are only served once activated explicitly
+            "activated": activate,
+            "fixture_predictions": model.predict(fixtures).astype(int).tolist() if fixtures is not None else None
+        }
+        # Written under a temporary name first, so a half-copied version is never picked up
+        staging_dir = version_dir + ".tmp"
+        os.makedirs(staging_dir)
+        shutil.copyfile(model_path, os.path.join(staging_dir, "model.pkl"))
+        with open(os.path.join(staging_dir, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(staging_dir, version_dir)
+        if activate:
+            self.activate(version)
+        return meta
+
+    def activate(self, version: str):
+        if version not in self.versions():
+            raise ValueError(f"Unknown version {version}")
+        _write_atomic(os.path.join(self.directory, "CURRENT"), version.encode())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the PnD model registry")
+    parser.add_argument("--registry", default=MODEL_REGISTRY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="add a model as a new version")
+    publish.add_argument("model_path")
+    publish.add_argument("version")
+    publish.add_argument("--description", default="")
+    publish.add_argument("--no-activate", action="store_true")
+    activate = commands.add_parser("activate", help="serve an existing version (also for rollbacks)")
+    activate.add_argument("version")
+    fixtures = commands.add_parser("fixtures", help="set the fixture rows versions are validated on")
+    fixtures.add_argument("npz_path", help="an .npz with an X matrix, e.g. a feature store export")
+    commands.add_parser("list")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    os.makedirs(args.registry, exist_ok=True)
+    if args.command == "publish":
+        print(json.dumps({k: v for k, v in registry.publish(args.model_path, args.version, args.description,
+                                                            not args.no_activate).items()
+                          if k != "fixture_predictions"}, indent=2))
+    elif args.command == "activate":
+        registry.activate(args.version)
+    elif args.command == "fixtures":
+        with np.load(args.npz_path) as source:
+            X = np.asarray(source["X"], dtype=np.float64).reshape(-1, N_FEATURES)
+        buffer_path = os.path.join(args.registry, "fixtures.npz")
+        np.savez(buffer_path + ".tmp.npz", X=X)
+        os.replace(buffer_path + ".tmp.npz", buffer_path)
+        print(f"{len(X)} fixture rows; versions published before this are checked for shape only")
+    else:
+        current = registry.current_version()
+        for version in registry.versions():
+            meta = registry.meta(version)
+            print(f"{'*' if version == current else ' '} {version} {meta['created_at']} {meta['sha256'][:12]} "
+                  f"{meta['description']}")
@@ -1,12 +1,48 @@
-import pickle 
-from fastapi import FastAPI,HTTPException
+import os
+import signal
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI,HTTPException,Request,Response
 from pydantic import BaseModel
 import pandas as pd
 import numpy as np
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
+from micro_batcher import MicroBatcher
+from model_registry import ModelRegistry
 
-app = FastAPI(title="Pump and Dump Detection API",description="API to predict pump and dump schemes in cryptocurrency markets",version="0.1")
+# Concurrent /predict rows are coalesced into one model call; PND_BATCHING=0 scores each request alone
+PND_BATCHING = os.environ.get("PND_BATCHING", "1") == "1"
+PND_MAX_BATCH = int(os.environ.get("PND_MAX_BATCH", 64))
+PND_MAX_WAIT_MS = float(os.environ.get("PND_MAX_WAIT_MS", 2))
+# Small batches are scored by the forest flattened into node arrays; PND_COMPILED=0 uses the pickled model as is
+PND_COMPILED = os.environ.get("PND_COMPILED", "1") == "1"
+
+# Inference runs on its own thread so the event loop keeps accepting requests
+executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+batcher = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global batcher
+    if PND_BATCHING:
+        batcher = MicroBatcher(score_matrix, executor, PND_MAX_BATCH, PND_MAX_WAIT_MS / 1000)
+        batcher.start()
+    # New model versions are picked up by polling the registry, or right away on SIGHUP
+    watcher = asyncio.create_task(registry.watch())
+    # Signal handlers can only be installed from the main thread (not e.g. under TestClient); polling still runs
+    if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, registry.request_refresh)
+    yield
+    watcher.cancel()
+    if batcher:
+        await batcher.stop()
+
+
+app = FastAPI(title="Pump and Dump Detection API",description="API to predict pump and dump schemes in cryptocurrency markets",version="0.1",lifespan=lifespan)
 
 
 app.add_middleware(
@@ -31,15 +67,24 @@ class PredictionRequest(BaseModel):
     minute_cos : float
 
 
-def load_model(model_path : str = "model.pkl"):
-    try:
-        with open(model_path, "rb") as f:
-            model = pickle.load(f)
-        return model
-    except Exception as e:
-        raise Exception("Error loading model: " + str(e))
+class BatchPredictionRequest(BaseModel):
+    rows : list[PredictionRequest]
 
-model = load_model()
+
+FEATURE_ORDER = list(PredictionRequest.model_fields)
+
+# Binary format of /predict/raw: rows of little-endian float32 features in FEATURE_ORDER,
+# answered with one (int8 prediction, float32 probability) record per row
+RAW_CONTENT_TYPE = "application/octet-stream"
+RAW_REQUEST_DTYPE = np.dtype("<f4")
+RAW_RESPONSE_DTYPE = np.dtype([("prediction", "i1"), ("probability", "<f4")])
+
+
+registry = ModelRegistry(compiled=PND_COMPILED)
+try:
+    registry.refresh()
+except Exception as e:
+    raise Exception("Error loading model: " + str(e))
 
 def get_features_array(request : PredictionRequest) -> np.ndarray: 
     return np.array([request.std_rush_order, request.avg_rush_order,
@@ -48,18 +93,99 @@ def get_features_array(request : PredictionRequest) -> np.ndarray:
                           request.minute_sin, request.minute_cos]).reshape(1,-1)
 
 
+def get_features_matrix(rows : list[PredictionRequest]) -> np.ndarray:
+    return np.array([[getattr(row, name) for name in FEATURE_ORDER] for row in rows],
+                    dtype=np.float64).reshape(-1, len(FEATURE_ORDER))
+
+
+def score_matrix(features : np.ndarray):
+    """Predictions and pump-class probabilities of a feature matrix, from a single pass over the model."""
+    # Read once, so a model swapped in meanwhile does not score half the matrix
+    predictor = registry.active.predictor
+    if not hasattr(predictor, "predict_proba"):
+        return predictor.predict(features), np.full(len(features), np.nan)
+    proba = predictor.predict_proba(features)
+    # Same as the classifier's own predict, without running the trees twice
+    predictions = predictor.classes_.take(np.argmax(proba, axis=1), axis=0)
+    return predictions, proba[:, list(predictor.classes_).index(1)]
+
+
 @app.post("/predict")
 async def predict(request : PredictionRequest):
     try:
         features = get_features_array(request)
-        prediction = model.predict(features)
-        return {"prediction": int(prediction[0])}
+        if batcher:
+            prediction, _ = await batcher.submit(features)
+        else:
+            predictions, _ = await asyncio.get_running_loop().run_in_executor(executor, score_matrix, features)
+            prediction = predictions[0]
+        return {"prediction": int(prediction)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/predict/batch")
+async def predict_batch(request : BatchPredictionRequest):
+    """Scores every row in one vectorized call; results follow the order of `rows`."""
+    if not request.rows:
+        return {"predictions": [], "probabilities": []}
+    try:
+        features = get_features_matrix(request.rows)
+        predictions, probabilities = await asyncio.get_running_loop().run_in_executor(
+            executor, score_matrix, features)
+        result = {"predictions": predictions.astype(int).tolist()}
+        if not np.isnan(probabilities).all():
+            # Probability of the pump-and-dump class
+            result["probabilities"] = probabilities.tolist()
+        return result
     except Exception as e:
-        e.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
-    
+
+@app.get("/schema")
+async def schema():
+    """Column order and encodings of the binary /predict/raw endpoint."""
+    return {
+        "columns": FEATURE_ORDER,
+        "content_type": RAW_CONTENT_TYPE,
+        "request_dtype": RAW_REQUEST_DTYPE.str,
+        "response_fields": [[name, RAW_RESPONSE_DTYPE.fields[name][0].str] for name in RAW_RESPONSE_DTYPE.names]
+    }
+
+
+@app.post("/predict/raw")
+async def predict_raw(request : Request):
+    """
+    Scores a row-major float32 matrix sent as the raw body. It is decoded in
+    place, without per-field objects; the model scores float32 values anyway.
+    """
+    body = await request.body()
+    row_size = RAW_REQUEST_DTYPE.itemsize * len(FEATURE_ORDER)
+    if len(body) % row_size:
+        raise HTTPException(status_code=400, detail=f"Body must be rows of {len(FEATURE_ORDER)} float32 values")
+    features = np.frombuffer(body, dtype=RAW_REQUEST_DTYPE).reshape(-1, len(FEATURE_ORDER))
+    if not np.isfinite(features).all():
+        raise HTTPException(status_code=400, detail="Features must be finite")
+    result = np.zeros(len(features), dtype=RAW_RESPONSE_DTYPE)
+    if len(features):
+        try:
+            if batcher and len(features) == 1:
+                result[0] = await batcher.submit(features)
+            else:
+                predictions, probabilities = await asyncio.get_running_loop().run_in_executor(
+                    executor, score_matrix, features)
+                result["prediction"] = predictions
+                result["probability"] = probabilities
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=result.tobytes(), media_type=RAW_CONTENT_TYPE)
+
+@app.get("/model")
+async def model_status():
+    """The model being served: version, checksum, when and how fast it was loaded, and rejected versions."""
+    return registry.status()
+
 if __name__ == "__main__":
-    uvicorn.run("pnd_detection_model:app", host="0.0.0.0", port=5040,reload=True)
+    uvicorn.run(app, host="0.0.0.0", port=5040)
 
 
 
@@ -0,0 +1,120 @@
+import os
+import time
+import argparse
+import requests
+import numpy as np
+
+from ohlcv_store import open_store
+
+
+BINANCE_API_URL = os.environ.get("BINANCE_API_URL", "https://api.binance.com")
+KLINES_LIMIT = 1000
+
+# Fixed-length Binance kline intervals, in seconds
+INTERVAL_SECONDS = {
+    "1m": 60, "3m": 180, "5m": 300, "15m": 900, "30m": 1800,
+    "1h": 3600, "2h": 7200, "4h": 14400, "6h": 21600, "8h": 28800, "12h": 43200,
+    "1d": 86400,
+}
+
+
+def last_closed_open_time(interval_seconds: int, now: float = None) -> int:
+    """Open time of the most recent candle that has fully closed."""
+    now = time.time() if now is None else now
+    return int(now // interval_seconds) * interval_seconds - interval_seconds
+
+
+def find_missing_timestamps(timestamps, interval_seconds: int, start: int, end: int) -> np.ndarray:
+    expected = np.arange(start, end + 1, interval_seconds, dtype=np.int64)
+    return np.setdiff1d(expected, np.asarray(timestamps, dtype=np.int64), assume_unique=True)
+
+
+def gap_ranges(missing: np.ndarray, interval_seconds: int) -> list:
+    """Groups sorted missing open times into contiguous (first, last) ranges."""
+    if len(missing) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(missing) != interval_seconds) + 1
+    return [(int(run[0]), int(run[-1])) for run in np.split(missing, breaks)]
+
+
+def fetch_klines(symbol: str, interval: str, start: int, end: int, session=None, base_url=BINANCE_API_URL) -> np.ndarray:
+    """
+    Fetches the candles opened in [start, end] (epoch seconds), KLINES_LIMIT per
+    request. Returns an (n, 6) array of open time and OHLCV.
+    """
+    session = session or requests.Session()
+    step = INTERVAL_SECONDS[interval]
+    pages = []
+    cursor = start
+    while cursor <= end:
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "startTime": cursor * 1000,
+            "endTime": end * 1000 + step * 1000 - 1,
+            "limit": KLINES_LIMIT
+        }
+        response = session.get(f"{base_url}/api/v3/klines", params=params, timeout=15)
+        if response.status_code != 200:
+            raise Exception("Error fetching data from Binance: " + response.text)
+        klines = response.json()
+        if not klines:
+            break
+        page = np.array([k[:6] for k in klines], dtype=np.float64)
+        page[:, 0] = page[:, 0] // 1000
+        pages.append(page)
+        cursor = int(page[-1, 0]) + step
+        if len(klines) < KLINES_LIMIT:
+            break
+    if not pages:
+        return np.empty((0, 6))
+    return np.concatenate(pages)
+
+
+def backfill(history, symbol: str = "ETHUSDT", interval: str = None, start: int = None, end: int = None,
+             session=None, base_url=BINANCE_API_URL) -> int:
+    """
+    Finds every candle missing from `history` between `start` (default: the first
+    stored candle) and `end` (default: the last closed candle), fetches the gaps
+    and merges them in one write. Returns the number of candles added.
+    """
+    interval = interval or history.interval
+    step = INTERVAL_SECONDS[interval]
+    timestamps = history.timestamps()
+    end = last_closed_open_time(step) if end is None else end
+    if start is None:
+        start = int(timestamps[0]) if len(timestamps) else end
+
+    missing = find_missing_timestamps(timestamps, step, start, end)
+    if len(missing) == 0:
+        return 0
+
+    fetched = [fetch_klines(symbol, interval, first, last, session, base_url)
+               for first, last in gap_ranges(missing, step)]
+    candles = np.concatenate(fetched)
+    # Pages can overlap at range edges; keep one candle per missing open time
+    open_times, first_index = np.unique(candles[:, 0].astype(np.int64), return_index=True)
+    candles = candles[first_index]
+    keep = np.isin(open_times, missing)
+    open_times, candles = open_times[keep], candles[keep]
+    if len(open_times) == 0:
+        return 0
+
+    last_ts = history.last_timestamp()
+    if last_ts is None or open_times[0] > last_ts:
+        history.append_many(open_times, candles[:, 1:])
+    else:
+        # Gaps inside the history: rewrite once with the merged rows
+        history.rewrite(np.concatenate([timestamps, open_times]),
+                        np.concatenate([history.values(), candles[:, 1:]]))
+    return len(open_times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill every missing candle in an OHLCV store from Binance")
+    parser.add_argument("store_path")
+    parser.add_argument("--symbol", default="ETHUSDT")
+    parser.add_argument("--interval", default=None, choices=sorted(INTERVAL_SECONDS))
+    args = parser.parse_args()
+    added = backfill(open_store(args.store_path), args.symbol, args.interval)
+    print(f"Added {added} candles to {args.store_path}")
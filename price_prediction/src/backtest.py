@@ -0,0 +1,91 @@
+import json
+import time
+import argparse
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import model_registry
+from inference_engine import InferenceEngine
+from ohlcv_store import open_store, to_epoch_seconds
+from windowing import window_view, count_windows
+
+
+SEQ_LENGTH = 30
+PRED_LENGTH = 7
+CLOSE_COL_INDEX = 3
+STORE_PATH = "ohlcv_store"
+
+
+def horizon_metrics(predicted: np.ndarray, actual: np.ndarray, last_close: np.ndarray) -> dict:
+    """Error metrics per horizon step over (n_windows, PRED_LENGTH) forecasts."""
+    errors = predicted - actual
+    direction_hit = np.sign(predicted - last_close[:, None]) == np.sign(actual - last_close[:, None])
+    return {
+        "mae": np.mean(np.abs(errors), axis=0).tolist(),
+        "rmse": np.sqrt(np.mean(errors ** 2, axis=0)).tolist(),
+        "mape": (np.mean(np.abs(errors / actual), axis=0) * 100).tolist(),
+        "bias": np.mean(errors, axis=0).tolist(),
+        "directional_accuracy": np.mean(direction_hit, axis=0).tolist()
+    }
+
+
+def backtest_version(version: int, data: np.ndarray, first_window: int, batch_size: int) -> dict:
+    model, scaler, meta = model_registry.load_version(version)
+    engine = InferenceEngine(model, SEQ_LENGTH, data.shape[1])
+
+    # Scale the whole history once, then read every window as a strided view
+    scaled = (data * scaler.scale_ + scaler.min_).astype(np.float32)
+    n_windows = count_windows(len(data), SEQ_LENGTH, PRED_LENGTH)
+    windows = window_view(scaled[:len(data) - PRED_LENGTH], SEQ_LENGTH)
+
+    start = time.perf_counter()
+    predicted_scaled = np.empty((n_windows - first_window, PRED_LENGTH), dtype=np.float32)
+    for offset in range(first_window, n_windows, batch_size):
+        batch = windows[offset:offset + batch_size]
+        predicted_scaled[offset - first_window:offset - first_window + len(batch)] = engine.predict(batch)
+    elapsed = time.perf_counter() - start
+
+    close_scale, close_offset = scaler.scale_[CLOSE_COL_INDEX], scaler.min_[CLOSE_COL_INDEX]
+    predicted = (predicted_scaled - close_offset) / close_scale
+    actual = sliding_window_view(data[SEQ_LENGTH:, CLOSE_COL_INDEX], PRED_LENGTH)[first_window:n_windows]
+    last_close = data[SEQ_LENGTH - 1 + first_window:SEQ_LENGTH - 1 + n_windows, CLOSE_COL_INDEX]
+
+    return {
+        "version": version,
+        "scaler_version": meta.get("scaler_version", 1),
+        "windows": int(n_windows - first_window),
+        "predict_seconds": elapsed,
+        **horizon_metrics(predicted, actual, last_close)
+    }
+
+
+def run(versions=None, start=None, batch_size=4096, store_path=STORE_PATH) -> dict:
+    """
+    Scores every forecast origin from `start` on (all of history by default)
+    for each model version, in batched predict calls.
+    """
+    history = open_store(store_path)
+    data = np.asarray(history.values())
+    first_window = 0
+    if start is not None:
+        # The window whose last input row is the first candle on or after `start`
+        first_row = int(np.searchsorted(history.timestamps(), to_epoch_seconds([start])[0]))
+        first_window = min(max(0, first_row - SEQ_LENGTH + 1), count_windows(len(data), SEQ_LENGTH, PRED_LENGTH))
+    versions = versions or model_registry.list_versions()
+    return {str(v): backtest_version(v, data, first_window, batch_size) for v in versions}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the LSTM forecaster")
+    parser.add_argument("--versions", type=int, nargs="+", default=None)
+    parser.add_argument("--start", default=None, help="First forecast origin date, e.g. 2023-01-01")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    report = run(args.versions, args.start, args.batch_size)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    for version, result in report.items():
+        print(f"v{version}: {result['windows']} windows in {result['predict_seconds']:.2f}s, "
+              f"MAE per step {np.round(result['mae'], 2).tolist()}")
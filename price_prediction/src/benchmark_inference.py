@@ -0,0 +1,50 @@
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+from tensorflow.keras.losses import MeanSquaredError
+
+from inference_engine import InferenceEngine
+
+
+SEQ_LENGTH = 30
+N_FEATURES = 5
+
+
+def latency(fn, x, repeat: int):
+    fn(x)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(x)
+        timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1e3, np.percentile(timings, 99) * 1e3
+
+
+def run(model_path, batch_sizes, repeat):
+    model = load_model(model_path, custom_objects={'mse': MeanSquaredError()})
+    inputs = {b: np.random.rand(b, SEQ_LENGTH, N_FEATURES).astype(np.float32) for b in batch_sizes}
+
+    # The previous serving path: model.predict with functions forced to run eagerly
+    tf.config.run_functions_eagerly(True)
+    eager = {b: latency(lambda x: model.predict(x, verbose=0), inputs[b], repeat) for b in batch_sizes}
+    tf.config.run_functions_eagerly(False)
+
+    engine = InferenceEngine(model, SEQ_LENGTH, N_FEATURES)
+    engine.warm_up()
+    graph = {b: latency(engine.predict, inputs[b], repeat) for b in batch_sizes}
+
+    print(f"{'batch':>5} | {'eager p50':>10} | {'eager p99':>10} | {'graph p50':>10} | {'graph p99':>10} | {'speedup':>7}")
+    for b in batch_sizes:
+        print(f"{b:>5} | {eager[b][0]:>8.2f}ms | {eager[b][1]:>8.2f}ms | "
+              f"{graph[b][0]:>8.2f}ms | {graph[b][1]:>8.2f}ms | {eager[b][0] / graph[b][0]:>6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare eager model.predict with the compiled inference engine")
+    parser.add_argument("--model", default="crypto_lstm_model.h5")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64, 128, 256])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    run(args.model, args.batch_sizes, args.repeat)
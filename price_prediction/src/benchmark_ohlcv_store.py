@@ -0,0 +1,78 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+from ohlcv_store import OHLCVStore, import_csv
+
+
+SEQ_LENGTH = 30
+
+
+def synthetic_history(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 300 * np.exp(np.cumsum(rng.normal(0, 0.03, n_rows)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.02, n_rows))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.02, n_rows))
+    volume = rng.uniform(1e8, 5e9, n_rows)
+    index = pd.date_range("2000-01-01", periods=n_rows, freq="h")
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index)
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def csv_read_tail(csv_path):
+    df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+    df.sort_index(inplace=True)
+    return df.values[-SEQ_LENGTH:]
+
+
+def csv_append(csv_path, day):
+    df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+    new_row = pd.DataFrame({"Open": [1.0], "High": [1.0], "Low": [1.0], "Close": [1.0], "Volume": [1.0]},
+                           index=[day])
+    df = pd.concat([df, new_row])
+    df.sort_index(inplace=True)
+    df.to_csv(csv_path)
+
+
+def run(sizes, repeat):
+    print(f"{'rows':>9} | {'csv read':>10} | {'store read':>10} | {'csv append':>10} | {'store append':>12}")
+    for n_rows in sizes:
+        workdir = tempfile.mkdtemp()
+        try:
+            csv_path = os.path.join(workdir, "history.csv")
+            synthetic_history(n_rows).to_csv(csv_path)
+            store = import_csv(csv_path, os.path.join(workdir, "store"))
+
+            csv_read = timed(lambda: csv_read_tail(csv_path), repeat)
+            store_read = timed(lambda: np.asarray(OHLCVStore(store.path).tail(SEQ_LENGTH)).sum(), repeat)
+
+            next_hours = iter(pd.date_range(store.to_frame().index[-1], periods=repeat + 1, freq="h")[1:])
+            csv_write = timed(lambda: csv_append(csv_path, next(next_hours)), repeat)
+            next_ts = iter(store.last_timestamp() + 3600 * np.arange(1, repeat + 1))
+            store_write = timed(lambda: store.append(next(next_ts), [1.0] * 5), repeat)
+
+            print(f"{n_rows:>9} | {csv_read * 1e3:>8.2f}ms | {store_read * 1e3:>8.3f}ms | "
+                  f"{csv_write * 1e3:>8.2f}ms | {store_write * 1e3:>10.3f}ms")
+        finally:
+            shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare CSV and binary store read/append latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
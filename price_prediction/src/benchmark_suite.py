@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import joblib
+from sklearn.preprocessing import MinMaxScaler
+
+from backfill import backfill, INTERVAL_SECONDS
+from benchmark_ohlcv_store import synthetic_history
+from fake_binance import start_fake_binance
+from ohlcv_store import OHLCVStore, to_epoch_seconds
+
+
+# Offline benchmark of the price_prediction hot paths against synthetic
+# histories. The service modules are imported from a scratch directory holding a
+# synthetic store and a small randomly initialised LSTM of the production shape,
+# so the real code runs without the shipped artifacts or network access.
+
+SEQ_LENGTH = 30
+PRED_LENGTH = 7
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def build_model(n_features: int):
+    from tensorflow.keras import Input, Sequential
+    from tensorflow.keras.layers import LSTM, Dropout, BatchNormalization, Dense
+
+    model = Sequential([
+        Input((SEQ_LENGTH, n_features)),
+        LSTM(50, return_sequences=True),
+        Dropout(0.2),
+        LSTM(50),
+        BatchNormalization(),
+        Dropout(0.2),
+        Dense(PRED_LENGTH)
+    ])
+    model.compile(optimizer="adam", loss="mse")
+    return model
+
+
+def write_store(path: str, n_rows: int) -> OHLCVStore:
+    df = synthetic_history(n_rows)
+    store = OHLCVStore.create(path, columns=list(df.columns), interval="1h")
+    store.rewrite(to_epoch_seconds(df.index), df.values)
+    return store
+
+
+def measure(fn, repeat: int, setup=None) -> dict:
+    timings, peaks = [], []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "p50_ms": float(np.percentile(timings, 50) * 1e3),
+        "p99_ms": float(np.percentile(timings, 99) * 1e3),
+        "peak_mb": float(max(peaks) / 2**20),
+        "repeat": repeat
+    }
+
+
+def run(sizes, repeat: int, finetune_repeat: int) -> list:
+    results = []
+    stores = {n_rows: write_store(os.path.join("stores", str(n_rows)), n_rows) for n_rows in sizes}
+
+    first = stores[sizes[0]]
+    shutil.copytree(first.path, "ohlcv_store")
+    build_model(len(first.columns)).save("crypto_lstm_model.h5")
+    joblib.dump(MinMaxScaler().fit(np.asarray(first.values())), "scaler.pkl")
+
+    import price_predictor
+    active = price_predictor._active
+
+    for n_rows, store in stores.items():
+        price_predictor.store = store
+        price_predictor._forecast_cache["key"] = None
+        price_predictor.predict()
+        print(f"{n_rows} rows")
+        cases = {
+            "load_data": (price_predictor.load_data, None),
+            "predict": (lambda: price_predictor.compute_forecast(store.tail(SEQ_LENGTH), active.engine, active.scaler), None),
+            "predict_cached": (price_predictor.predict, None),
+        }
+        for name, (fn, setup) in cases.items():
+            results.append({"function": name, "rows": n_rows, **measure(fn, repeat, setup)})
+            print(f"  {name:<28} p50 {results[-1]['p50_ms']:>9.3f}ms  p99 {results[-1]['p99_ms']:>9.3f}ms  "
+                  f"peak {results[-1]['peak_mb']:>8.2f}MB")
+
+    # Imported last: the worker switches TF to eager mode for training
+    import finetune_worker
+
+    # The worker's update path: backfill against the local klines stand-in, which serves
+    # candles past the end of every synthetic history so each timed call adds one candle
+    step = INTERVAL_SECONDS[first.interval]
+    server, base_url = start_fake_binance(
+        now=max(store.last_timestamp() for store in stores.values()) + (repeat + 1) * step)
+
+    for n_rows, store in stores.items():
+        ends = iter(store.last_timestamp() + step * (i + 1) for i in range(repeat))
+
+        def next_candle():
+            return store, "ETHUSDT", None, None, next(ends), None, base_url
+
+        model, scaler = active.engine.model, active.scaler
+        cases = {
+            "backfill": (backfill, next_candle, repeat),
+            "fine_tune_model_with_data": (lambda: finetune_worker.fine_tune_model_with_data(
+                store.values(), scaler, model), None, finetune_repeat),
+        }
+        print(f"{n_rows} rows")
+        for name, (fn, setup, n) in cases.items():
+            results.append({"function": name, "rows": n_rows, **measure(fn, n, setup)})
+            print(f"  {name:<28} p50 {results[-1]['p50_ms']:>9.3f}ms  p99 {results[-1]['p99_ms']:>9.3f}ms  "
+                  f"peak {results[-1]['peak_mb']:>8.2f}MB")
+    server.shutdown()
+    return results
+
+
+def compare(results: list, baseline_path: str, threshold: float):
+    with open(baseline_path) as f:
+        baseline = {(r["function"], r["rows"]): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path} (p50, flagged above {threshold:.0%} slower):")
+    for r in results:
+        base = baseline.get((r["function"], r["rows"]))
+        if base is None:
+            continue
+        ratio = r["p50_ms"] / base["p50_ms"]
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        print(f"  {r['function']:<28} {r['rows']:>9} rows  {ratio:>5.2f}x{flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the price_prediction service on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--finetune-repeat", type=int, default=3)
+    parser.add_argument("--output", default=f"benchmark_{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    parser.add_argument("--baseline", default=None, help="Earlier results JSON to compare against")
+    parser.add_argument("--regression-threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    workdir = tempfile.mkdtemp(prefix="price_prediction_bench_")
+    sys.path.insert(0, src_dir)
+    os.chdir(workdir)
+    try:
+        results = run(sorted(args.sizes), args.repeat, args.finetune_repeat)
+    finally:
+        os.chdir(src_dir)
+        shutil.rmtree(workdir)
+
+    import tensorflow as tf
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "tensorflow": tf.__version__,
+        "machine": platform.machine(),
+        "results": results
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+    if baseline:
+        compare(results, baseline, args.regression_threshold)
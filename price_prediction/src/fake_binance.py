@@ -0,0 +1,80 @@
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from backfill import INTERVAL_SECONDS
+
+
+# Serves Binance /api/v3/klines with candles computed from their open time.
+
+def synthetic_kline(open_time: int, interval_seconds: int) -> list:
+    base = 1000 + (open_time // interval_seconds) % 500
+    return [
+        open_time * 1000,
+        f"{base:.2f}", f"{base + 10:.2f}", f"{base - 10:.2f}", f"{base + 1:.2f}", f"{base * 100:.2f}",
+        (open_time + interval_seconds) * 1000 - 1,
+        f"{base * 100 * base:.2f}", 100, "0", "0", "0"
+    ]
+
+
+class FakeBinanceHandler(BaseHTTPRequestHandler):
+    symbols = {"ETHUSDT", "BTCUSDT"}
+    listed_from = 0
+    # Latest open time served; None follows the clock
+    now = None
+    request_log = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.request_log.append((url.path, params))
+        if url.path != "/api/v3/klines":
+            return self._send(404, {"code": -1, "msg": "Not found"})
+        if params.get("symbol") not in self.symbols:
+            return self._send(400, {"code": -1121, "msg": "Invalid symbol."})
+        if params.get("interval") not in INTERVAL_SECONDS:
+            return self._send(400, {"code": -1120, "msg": "Invalid interval."})
+
+        step = INTERVAL_SECONDS[params["interval"]]
+        limit = min(int(params.get("limit", 500)), 1000)
+        now = int(time.time()) if self.now is None else self.now
+        start = max(int(params.get("startTime", 0)) // 1000, self.listed_from)
+        end = min(int(params.get("endTime", now * 1000)) // 1000, now)
+        first = -(-start // step) * step
+        klines = []
+        open_time = first
+        while open_time <= end and len(klines) < limit:
+            klines.append(synthetic_kline(open_time, step))
+            open_time += step
+        self._send(200, klines)
+
+    def _send(self, status: int, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_binance(host: str = "127.0.0.1", port: int = 0, listed_from: int = 0, now: int = None):
+    """Starts the stand-in on a background thread and returns (server, base_url)."""
+    handler = type("Handler", (FakeBinanceHandler,), {"listed_from": listed_from, "now": now, "request_log": []})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve synthetic Binance klines locally")
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("0.0.0.0", args.port), FakeBinanceHandler)
+    print(f"Fake Binance klines API on http://0.0.0.0:{args.port}/api/v3/klines")
+    server.serve_forever()
@@ -0,0 +1,86 @@
+import argparse
+import numpy as np
+from datetime import datetime
+import tensorflow as tf
+tf.config.run_functions_eagerly(True)
+from tensorflow.keras.optimizers import Adam
+
+from backfill import backfill
+from model_registry import current_version, load_version, write_version
+from ohlcv_store import open_store
+from windowing import supervised_windows
+
+
+# Runs the daily fine-tune in its own process so training never shares a model
+# or a TF runtime with the serving API. The result is written to the registry
+# as a new version; the API decides when to swap to it.
+
+STORE_PATH = "ohlcv_store"
+FINETUNE_WINDOWS = 100
+
+
+def update_scaler(scaler, history, seen_until=None) -> bool:
+    """
+    Folds the rows stored after `seen_until` into the scaler's running min/max,
+    so the cost depends on the new rows only. Returns True if the scaling changed.
+    """
+    start = 0 if seen_until is None else int(np.searchsorted(history.timestamps(), seen_until, side="right"))
+    new_rows = history.values()[start:]
+    if len(new_rows) == 0:
+        return False
+    data_min, data_max = scaler.data_min_.copy(), scaler.data_max_.copy()
+    scaler.partial_fit(new_rows)
+    return not (np.array_equal(data_min, scaler.data_min_) and np.array_equal(data_max, scaler.data_max_))
+
+
+def fine_tune_model_with_data(data, scaler, model, seq_length=30, pred_length=7):
+
+    # Only the rows behind the last FINETUNE_WINDOWS windows are scaled and copied
+    n_rows = min(len(data), FINETUNE_WINDOWS + seq_length + pred_length - 1)
+    updated_scaled = scaler.transform(data[-n_rows:])
+
+    X_finetune, y_finetune = supervised_windows(updated_scaled, seq_length, pred_length,
+                                                target_col=3, last_n=FINETUNE_WINDOWS)
+
+
+    model.compile(optimizer=Adam(learning_rate=1e-7), loss='mse')
+
+
+    model.fit(X_finetune, y_finetune, epochs=2, batch_size=16, verbose=1)
+
+    return model, scaler
+
+
+def run(base_version=None, store_path=STORE_PATH, symbol="ETHUSDT") -> int:
+    base_version = base_version or current_version()
+    model, scaler, meta = load_version(base_version)
+
+    # Fills every candle missed since the last run, not just yesterday's
+    history = open_store(store_path)
+    added = backfill(history, symbol)
+    print(f"Historical data updated with {added} candles.")
+
+    scaler_version = meta.get("scaler_version", 1)
+    if update_scaler(scaler, history, meta.get("scaler_seen_until")):
+        scaler_version += 1
+        print("Scaler range changed; saving it as scaler version", scaler_version)
+
+    model, scaler = fine_tune_model_with_data(history.values(), scaler, model)
+    version = write_version(model, scaler, {
+        "parent_version": base_version,
+        "scaler_version": scaler_version,
+        "scaler_seen_until": history.last_timestamp(),
+        "rows": len(history),
+        "last_date": datetime.utcfromtimestamp(history.last_timestamp()).isoformat()
+    })
+    print("Model fine-tuned successfully.")
+    return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fine-tune the LSTM and publish a new model version")
+    parser.add_argument("--base-version", type=int, default=None)
+    args = parser.parse_args()
+    version = run(args.base_version)
+    # The last line of output is read by the API to find the new version
+    print(f"NEW_VERSION {version}")
@@ -0,0 +1,30 @@
+import numpy as np
+import tensorflow as tf
+
+
+class InferenceEngine:
+    """
+    Serving-only wrapper around the LSTM. The forward pass is traced once into a
+    graph with a fixed (None, seq_length, n_features) float32 signature, so every
+    batch size reuses the same concrete function and skips Keras' predict loop.
+    """
+
+    def __init__(self, model, seq_length: int, n_features: int):
+        self.model = model
+        self.input_spec = tf.TensorSpec(shape=(None, seq_length, n_features), dtype=tf.float32)
+        self._forward = tf.function(self._call, input_signature=[self.input_spec])
+
+    def _call(self, x):
+        return self.model(x, training=False)
+
+    def warm_up(self, batch_sizes=(1,)):
+        # Traces the graph and touches the kernels before the first real request
+        for batch_size in batch_sizes:
+            self.predict(np.zeros((batch_size, *self.input_spec.shape[1:]), dtype=np.float32))
+
+    def predict(self, x) -> np.ndarray:
+        return self._forward(tf.convert_to_tensor(x, dtype=tf.float32)).numpy()
+
+    def export(self, path: str):
+        """Writes the model as a SavedModel with the serving signature."""
+        tf.saved_model.save(self.model, path, signatures={"serving_default": self._forward.get_concrete_function()})
@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import shutil
+import joblib
+from datetime import datetime
+from tensorflow.keras.models import load_model
+from tensorflow.keras.losses import MeanSquaredError
+
+
+REGISTRY_DIR = "models"
+CURRENT_FILE = "CURRENT"
+MODEL_FILE = "model.h5"
+SCALER_FILE = "scaler.pkl"
+META_FILE = "meta.json"
+
+
+# Layout: models/v0001/{model.h5, scaler.pkl, meta.json}, plus a CURRENT file
+# naming the version the API serves. A version directory is written under a
+# temporary name and renamed into place, so readers never see a partial one.
+
+def version_dir(version: int, registry_dir: str = REGISTRY_DIR) -> str:
+    return os.path.join(registry_dir, f"v{version:04d}")
+
+
+def list_versions(registry_dir: str = REGISTRY_DIR) -> list:
+    if not os.path.isdir(registry_dir):
+        return []
+    versions = []
+    for name in os.listdir(registry_dir):
+        if name.startswith("v") and name[1:].isdigit():
+            versions.append(int(name[1:]))
+    return sorted(versions)
+
+
+def latest_version(registry_dir: str = REGISTRY_DIR):
+    versions = list_versions(registry_dir)
+    return versions[-1] if versions else None
+
+
+def current_version(registry_dir: str = REGISTRY_DIR):
+    path = os.path.join(registry_dir, CURRENT_FILE)
+    if not os.path.exists(path):
+        return latest_version(registry_dir)
+    with open(path) as f:
+        return int(f.read().strip())
+
+
+def set_current_version(version: int, registry_dir: str = REGISTRY_DIR):
+    path = os.path.join(registry_dir, CURRENT_FILE)
+    with open(path + ".tmp", "w") as f:
+        f.write(str(version))
+    os.replace(path + ".tmp", path)
+
+
+def read_meta(version: int, registry_dir: str = REGISTRY_DIR) -> dict:
+    with open(os.path.join(version_dir(version, registry_dir), META_FILE)) as f:
+        return json.load(f)
+
+
+def _publish(tmp_dir: str, registry_dir: str) -> int:
+    # Retry on a concurrent writer taking the same version number
+    while True:
+        version = (latest_version(registry_dir) or 0) + 1
+        try:
+            os.rename(tmp_dir, version_dir(version, registry_dir))
+            return version
+        except OSError:
+            if not os.path.exists(version_dir(version, registry_dir)):
+                raise
+
+
+def write_version(model, scaler, meta: dict, registry_dir: str = REGISTRY_DIR) -> int:
+    """Saves a model/scaler pair as a new version and returns its number."""
+    os.makedirs(registry_dir, exist_ok=True)
+    tmp_dir = os.path.join(registry_dir, f".tmp-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(tmp_dir)
+    model.save(os.path.join(tmp_dir, MODEL_FILE))
+    joblib.dump(scaler, os.path.join(tmp_dir, SCALER_FILE))
+    with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+        json.dump({"created_at": datetime.utcnow().isoformat(), **meta}, f, indent=2)
+    return _publish(tmp_dir, registry_dir)
+
+
+def load_version(version: int, registry_dir: str = REGISTRY_DIR):
+    path = version_dir(version, registry_dir)
+    model = load_model(os.path.join(path, MODEL_FILE), custom_objects={'mse': MeanSquaredError()})
+    scaler = joblib.load(os.path.join(path, SCALER_FILE))
+    return model, scaler, read_meta(version, registry_dir)
+
+
+def bootstrap(model_path: str, scaler_path: str, meta: dict = None, registry_dir: str = REGISTRY_DIR) -> int:
+    """Seeds an empty registry with the model and scaler shipped with the service."""
+    if list_versions(registry_dir):
+        return current_version(registry_dir)
+    os.makedirs(registry_dir, exist_ok=True)
+    tmp_dir = os.path.join(registry_dir, f".tmp-bootstrap-{os.getpid()}")
+    os.makedirs(tmp_dir, exist_ok=True)
+    shutil.copy(model_path, os.path.join(tmp_dir, MODEL_FILE))
+    shutil.copy(scaler_path, os.path.join(tmp_dir, SCALER_FILE))
+    with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+        json.dump({"created_at": datetime.utcnow().isoformat(), "parent_version": None,
+                   "source": os.path.basename(model_path), **(meta or {})}, f, indent=2)
+    version = _publish(tmp_dir, registry_dir)
+    set_current_version(version, registry_dir)
+    return version
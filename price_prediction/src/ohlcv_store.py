@@ -0,0 +1,180 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+DATA_FILE = "ohlcv.bin"
+META_FILE = "meta.json"
+
+
+def record_dtype(n_columns: int) -> np.dtype:
+    # One fixed-size little-endian record per candle: the open time in epoch
+    # seconds followed by the OHLCV values.
+    return np.dtype([("ts", "<i8"), ("values", "<f8", (n_columns,))])
+
+
+def to_epoch_seconds(dates) -> np.ndarray:
+    return pd.DatetimeIndex(pd.to_datetime(dates)).values.astype("datetime64[s]").astype(np.int64)
+
+
+class OHLCVStore:
+    """
+    Append-only OHLCV history kept in a single memory-mapped binary file.
+
+    Rows are sorted by timestamp. Appending a candle writes one record at the
+    end of the file, and `tail(n)` returns a view on the mapping, so neither
+    depends on the length of the history.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.columns = self.meta["columns"]
+        self.interval = self.meta.get("interval", "1d")
+        self.dtype = record_dtype(len(self.columns))
+        self.data_path = os.path.join(path, DATA_FILE)
+        self._records = None
+        self._mapped_file = None
+
+    @classmethod
+    def create(cls, path: str, columns=COLUMNS, interval: str = "1d"):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, META_FILE), "w") as f:
+            json.dump({"columns": list(columns), "interval": interval}, f)
+        open(os.path.join(path, DATA_FILE), "ab").close()
+        return cls(path)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, META_FILE)) and os.path.exists(os.path.join(path, DATA_FILE))
+
+    def __len__(self):
+        # A torn trailing write leaves a partial record, which is ignored
+        return os.path.getsize(self.data_path) // self.dtype.itemsize
+
+    def version(self):
+        stat = os.stat(self.data_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def records(self) -> np.ndarray:
+        # Remap only when the file grew or was replaced by a rewrite
+        stat = os.stat(self.data_path)
+        mapped_file = (stat.st_ino, stat.st_size)
+        if mapped_file != self._mapped_file:
+            n_rows = stat.st_size // self.dtype.itemsize
+            if n_rows == 0:
+                self._records = np.empty(0, dtype=self.dtype)
+            else:
+                self._records = np.memmap(self.data_path, dtype=self.dtype, mode="r", shape=(n_rows,))
+            self._mapped_file = mapped_file
+        return self._records
+
+    def timestamps(self) -> np.ndarray:
+        return self.records()["ts"]
+
+    def values(self) -> np.ndarray:
+        return self.records()["values"]
+
+    def tail(self, n: int) -> np.ndarray:
+        return self.values()[-n:]
+
+    def last_timestamp(self):
+        records = self.records()
+        return int(records["ts"][-1]) if len(records) else None
+
+    def locate(self, start=None, end=None) -> slice:
+        ts = self.timestamps()
+        lo = 0 if start is None else int(np.searchsorted(ts, to_epoch_seconds([start])[0], side="left"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, to_epoch_seconds([end])[0], side="right"))
+        return slice(lo, hi)
+
+    def to_frame(self, start=None, end=None) -> pd.DataFrame:
+        records = self.records()[self.locate(start, end)]
+        index = pd.DatetimeIndex(records["ts"].astype("datetime64[s]").astype("datetime64[ns]"))
+        return pd.DataFrame(np.array(records["values"]), index=index, columns=self.columns)
+
+    def append(self, timestamp: int, row) -> bool:
+        """
+        Appends one candle. A candle for the last stored timestamp replaces it
+        in place; older timestamps are rejected. Returns True if a row was added.
+        """
+        last_ts = self.last_timestamp()
+        record = np.zeros(1, dtype=self.dtype)
+        record["ts"] = timestamp
+        record["values"] = np.asarray(row, dtype=np.float64)
+        if last_ts is not None and timestamp < last_ts:
+            raise ValueError(f"Timestamp {timestamp} is older than the last stored candle {last_ts}")
+        if last_ts is not None and timestamp == last_ts:
+            with open(self.data_path, "r+b") as f:
+                f.seek((len(self) - 1) * self.dtype.itemsize)
+                f.write(record.tobytes())
+            return False
+        with open(self.data_path, "r+b") as f:
+            # Drop any torn record left by an interrupted append
+            f.truncate(len(self) * self.dtype.itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(record.tobytes())
+        return True
+
+    def append_many(self, timestamps, rows) -> int:
+        """Appends candles newer than the last stored one in a single write."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        last_ts = self.last_timestamp()
+        if len(timestamps) == 0:
+            return 0
+        if np.any(np.diff(timestamps) <= 0) or (last_ts is not None and timestamps[0] <= last_ts):
+            raise ValueError("append_many needs strictly increasing timestamps after the last stored candle")
+        records = np.zeros(len(timestamps), dtype=self.dtype)
+        records["ts"] = timestamps
+        records["values"] = np.asarray(rows, dtype=np.float64).reshape(len(timestamps), len(self.columns))
+        with open(self.data_path, "r+b") as f:
+            f.truncate(len(self) * self.dtype.itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(records.tobytes())
+        return len(records)
+
+    def rewrite(self, timestamps, rows):
+        """Replaces the whole history atomically (used by importers and merges)."""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.float64).reshape(len(timestamps), len(self.columns))
+        order = np.argsort(timestamps, kind="stable")
+        records = np.zeros(len(timestamps), dtype=self.dtype)
+        records["ts"] = timestamps[order]
+        records["values"] = rows[order]
+        tmp_path = self.data_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.data_path)
+
+
+def open_store(path: str, csv_path: str = None) -> OHLCVStore:
+    """Opens the store at `path`, importing it from `csv_path` on first use."""
+    if OHLCVStore.exists(path):
+        return OHLCVStore(path)
+    if csv_path is None:
+        raise FileNotFoundError(f"No OHLCV store at {path}")
+    return import_csv(csv_path, path)
+
+
+def import_csv(csv_path: str, store_path: str, interval: str = "1d") -> OHLCVStore:
+    df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    store = OHLCVStore.create(store_path, columns=list(df.columns), interval=interval)
+    store.rewrite(to_epoch_seconds(df.index), df.values)
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import an OHLCV CSV into a binary store")
+    parser.add_argument("csv_path")
+    parser.add_argument("store_path")
+    parser.add_argument("--interval", default="1d")
+    args = parser.parse_args()
+    store = import_csv(args.csv_path, args.store_path, args.interval)
+    print(f"Imported {len(store)} rows into {args.store_path}")
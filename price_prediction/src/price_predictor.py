@@ -1,30 +1,26 @@
 
 from fastapi import FastAPI
 import numpy as np
-import pandas as pd
 import joblib
 import uvicorn
-from tensorflow.keras.models import load_model
-from tensorflow.keras.losses import MeanSquaredError  # For custom object mapping
 
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 import numpy as np
-import pandas as pd
 import joblib
 from datetime import datetime
-from tensorflow.keras.models import load_model
-from tensorflow.keras.losses import MeanSquaredError
-from tensorflow.keras.callbacks import EarlyStopping
 import uvicorn
-import tensorflow as tf
-tf.config.run_functions_eagerly(True) 
-from tensorflow.keras.optimizers import Adam
 
-import requests
-from datetime import datetime, timedelta
+import os
+import sys
+import threading
+import subprocess
+from collections import namedtuple
 from apscheduler.schedulers.background import BackgroundScheduler
 from fastapi.middleware.cors import CORSMiddleware
+from ohlcv_store import OHLCVStore, open_store
+import model_registry
+from inference_engine import InferenceEngine
 
 
 
@@ -38,11 +34,6 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-model = load_model("crypto_lstm_model.h5", custom_objects={'mse': MeanSquaredError()})
-
-scaler = joblib.load("scaler.pkl")
-
-
 #-------Prediction-----------------------------
 
 
@@ -50,168 +41,224 @@ scaler = joblib.load("scaler.pkl")
 SEQ_LENGTH = 30   
 PRED_LENGTH = 7   
 
+CSV_PATH = "preprocessed_ethereum_data.csv"
+STORE_PATH = "ohlcv_store"
+
+# The CSV is only read once, to seed the binary store on first start
+store = open_store(STORE_PATH, csv_path=CSV_PATH)
 
 
 def load_data():
 
-    df = pd.read_csv("preprocessed_ethereum_data.csv", index_col=0, parse_dates=True)
-    df.sort_index(inplace=True)  
-    return df
+    return store.to_frame()
+
+
+# --- Forecast cache ---
+# The forecast only changes when the history or the model changes, so it is
+# computed once per (model version, data_version) and served from memory.
+_forecast_lock = threading.Lock()
+_forecast_cache = {"key": None, "result": None}
+
+
+def data_version():
+    return store.version()
+
+
+CLOSE_COL_INDEX = 3
+
+
+def forecast_windows(windows, scalers, engine):
+    """
+    Predicts PRED_LENGTH close prices for a stack of raw (S, SEQ_LENGTH, n_features)
+    windows, each scaled with its own MinMax scaler, in a single engine call.
+    """
+    scale = np.stack([s.scale_ for s in scalers])[:, None, :]
+    offset = np.stack([s.min_ for s in scalers])[:, None, :]
+    windows_scaled = np.asarray(windows) * scale + offset
+
+    predictions_scaled = engine.predict(windows_scaled).reshape(len(scalers), PRED_LENGTH)
+
+    # Inverse of the close column only, for all symbols at once
+    close_scale = scale[:, :, CLOSE_COL_INDEX]
+    close_offset = offset[:, :, CLOSE_COL_INDEX]
+    return (predictions_scaled - close_offset) / close_scale
+
+
+def compute_forecast(data, engine, scaler):
+    if data.shape[0] < SEQ_LENGTH:
+        return {"error": "Not enough data for prediction."}
+
+    predictions = forecast_windows(data[None, -SEQ_LENGTH:], [scaler], engine)[0]
+
+    return {"predicted_close_prices": predictions.tolist()}
+
+
+def get_forecast():
+    active = _active
+    key = (active.version, data_version())
+    if _forecast_cache["key"] == key:
+        return _forecast_cache["result"]
+    with _forecast_lock:
+        if _forecast_cache["key"] != key:
+            result = compute_forecast(store.tail(SEQ_LENGTH), active.engine, active.scaler)
+            result = {**result, "model_version": active.version, "scaler_version": active.scaler_version}
+            _forecast_cache["result"] = result
+            _forecast_cache["key"] = key
+        return _forecast_cache["result"]
+
 
 # --- Predict Endpoint ---
 @app.get("/predict")
 def predict():
     """
     Uses the most recent SEQ_LENGTH days from the preprocessed data to predict the next PRED_LENGTH days
-    of the 'Close' price.
+    of the 'Close' price. The result is cached until the data or the model changes.
     """
-    # Load the preprocessed data
-    df = load_data()
-    data = df.values 
-    n_features = data.shape[1]  
+    return get_forecast()
 
-    
-    data_scaled = scaler.transform(data)
 
-    
-    if data_scaled.shape[0] < SEQ_LENGTH:
-        return {"error": "Not enough data for prediction."}
+# --- Multi-symbol batch prediction ---
+# Extra pairs live in symbols/<SYMBOL>/ with their own OHLCV store and scaler.pkl
+# and share the model. DEFAULT_SYMBOL is the Ethereum history served by /predict.
+DEFAULT_SYMBOL = "ETHUSDT"
+SYMBOLS_DIR = "symbols"
+_symbol_assets = {}
 
-    
-    last_sequence = data_scaled[-SEQ_LENGTH:]  
-    
-    last_sequence = last_sequence.reshape(1, SEQ_LENGTH, n_features)
 
-  
-    predictions_scaled = model.predict(last_sequence)  
-    predictions_scaled = predictions_scaled.reshape(PRED_LENGTH, 1)  
+class BatchPredictionRequest(BaseModel):
+    symbols: list[str]
 
 
-    close_col_index = 3
-    dummy_array = np.zeros((PRED_LENGTH, n_features))
-  
-    dummy_array[:, close_col_index] = predictions_scaled.flatten()
+def get_symbol_assets(symbol: str, active=None):
+    if symbol == DEFAULT_SYMBOL:
+        return store, (active or _active).scaler
+    if symbol not in _symbol_assets:
+        symbol_dir = os.path.join(SYMBOLS_DIR, symbol)
+        # Both a scaler and a history are needed; a symbol missing either is reported, not a 500
+        if not (os.path.exists(os.path.join(symbol_dir, "scaler.pkl"))
+                and OHLCVStore.exists(os.path.join(symbol_dir, "ohlcv_store"))):
+            return None
+        _symbol_assets[symbol] = (open_store(os.path.join(symbol_dir, "ohlcv_store")),
+                                  joblib.load(os.path.join(symbol_dir, "scaler.pkl")))
+    return _symbol_assets[symbol]
 
-    predictions_full = scaler.inverse_transform(dummy_array)
- 
-    predictions = predictions_full[:, close_col_index]
 
+@app.post("/predict/batch")
+def predict_batch(request: BatchPredictionRequest):
+    """
+    Predicts the next PRED_LENGTH close prices for every requested symbol with one
+    inference call over the stacked windows.
+    """
+    active = _active
+    unknown = [symbol for symbol in request.symbols if get_symbol_assets(symbol, active) is None]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown or unavailable symbols: {unknown}")
+
+    symbols, windows, scalers, errors = [], [], [], {}
+    for symbol in dict.fromkeys(request.symbols):
+        symbol_store, symbol_scaler = get_symbol_assets(symbol, active)
+        if len(symbol_store) < SEQ_LENGTH:
+            errors[symbol] = "Not enough data for prediction."
+            continue
+        symbols.append(symbol)
+        windows.append(symbol_store.tail(SEQ_LENGTH))
+        scalers.append(symbol_scaler)
+
+    predictions = forecast_windows(np.stack(windows), scalers, active.engine) if symbols else []
+    return {
+        "predicted_close_prices": {symbol: row.tolist() for symbol, row in zip(symbols, predictions)},
+        "errors": errors
+    }
 
-    return {"predicted_close_prices": predictions.tolist()}
 
 
 
+#------------model versions---------------------------------------------
+# The API serves one registry version at a time. `_active` is replaced as a
+# whole, so a request always sees a model and the scaler it was saved with.
+ActiveModel = namedtuple("ActiveModel", ["version", "engine", "scaler", "scaler_version", "loaded_at"])
 
-#------------fine-tunining---------------------------------------------
-def fetch_yesterday_data(symbol="ETHUSDT"):
-    
-    end_time = int(datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0).timestamp() * 1000) - 1
-    start_time = int((datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)).timestamp() * 1000)
-    
-    url = "https://api.binance.com/api/v3/klines"
-    params = {
-        "symbol": symbol,
-        "interval": "1d",
-        "startTime": start_time,
-        "endTime": end_time,
-        "limit": 1
-    }
-    
-    response = requests.get(url, params=params)
-    if response.status_code != 200:
-        raise Exception("Error fetching data from Binance: " + response.text)
-    data = response.json()
-    
-    if len(data) == 0:
-        raise Exception("No data returned from Binance for the given period.")
-    
-   
-    kline = data[0]
-    
-    daily_data = {
-        "date": datetime.utcfromtimestamp(kline[0]/1000).strftime("%b %d, %Y"),
-        "open": float(kline[1]),
-        "high": float(kline[2]),
-        "low": float(kline[3]),
-        "close": float(kline[4]),
-        "volume": float(kline[5])
+_active = None
+_swap_lock = threading.Lock()
+_version_history = []
+
+
+def warm_up(engine, scaler):
+    """Traces the inference graph, then rejects a model whose forecast is not finite."""
+    engine.warm_up()
+    predictions = forecast_windows(store.tail(SEQ_LENGTH)[None], [scaler], engine)
+    if not np.all(np.isfinite(predictions)):
+        raise ValueError("Warm-up prediction is not finite")
+
+
+def activate_version(version: int, record_history=True):
+    global _active
+    model, scaler, meta = model_registry.load_version(version)
+    engine = InferenceEngine(model, SEQ_LENGTH, len(store.columns))
+    warm_up(engine, scaler)
+    with _swap_lock:
+        if record_history and _active is not None:
+            _version_history.append(_active.version)
+        _active = ActiveModel(version, engine, scaler, meta.get("scaler_version", 1),
+                              datetime.utcnow().isoformat())
+        model_registry.set_current_version(version)
+    print(f"Serving model version {version}.")
+
+
+# The shipped scaler was fitted on the shipped history, i.e. scaler version 1
+model_registry.bootstrap("crypto_lstm_model.h5", "scaler.pkl",
+                         {"scaler_version": 1, "scaler_seen_until": store.last_timestamp()})
+activate_version(model_registry.current_version())
+
+
+@app.get("/model")
+def model_info():
+    active = _active
+    return {
+        "version": active.version,
+        "scaler_version": active.scaler_version,
+        "loaded_at": active.loaded_at,
+        "meta": model_registry.read_meta(active.version),
+        "available_versions": model_registry.list_versions(),
+        "previous_versions": list(_version_history)
     }
-    return daily_data
-
-
-def update_historical_data(new_data: dict, csv_path="preprocessed_ethereum_data.csv"):
-    import pandas as pd
-    
-    df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
-    
-    new_row = pd.DataFrame({
-        "Open": [new_data["open"]],
-        "High": [new_data["high"]],
-        "Low": [new_data["low"]],
-        "Close": [new_data["close"]],
-        "Volume": [new_data["volume"]]
-    }, index=[pd.to_datetime(new_data["date"], format="%b %d, %Y")])
-    
-    
-    df = pd.concat([df, new_row])
-    df.sort_index(inplace=True)
-    
-    df.to_csv(csv_path)
-    return df
-
-
-
-def fine_tune_model_with_data(df, scaler, model, seq_length=30, pred_length=7):
-    
-    data = df.values
-    
-    scaler.fit(data)
-    updated_scaled = scaler.transform(data)
-    
-    
-    def create_sequences_multi_step(data, seq_length, pred_length):
-        X, y = [], []
-        for i in range(len(data) - seq_length - pred_length + 1):
-            X.append(data[i:i+seq_length])
-            y.append(data[i+seq_length:i+seq_length+pred_length, 3])  
-        return np.array(X), np.array(y)
-    
-    X, y = create_sequences_multi_step(updated_scaled, seq_length, pred_length)
-    
-    
-    if X.shape[0] > 100:
-        X_finetune = X[-100:]
-        y_finetune = y[-100:]
-    else:
-        X_finetune, y_finetune = X, y
-    
-    
-    from tensorflow.keras.optimizers import Adam
-    model.compile(optimizer=Adam(learning_rate=1e-7), loss='mse')
-    
-    
-    model.fit(X_finetune, y_finetune, epochs=2, batch_size=16, verbose=1)
-    
-    
-    model.save("crypto_lstm_model.h5")
-    import joblib
-    joblib.dump(scaler, "scaler.pkl")
-    
-    return model, scaler
 
 
+@app.post("/model/rollback")
+def rollback(version: int = None):
+    """Swaps back to the previously served version, or to `version` if given."""
+    if version is None:
+        if not _version_history:
+            raise HTTPException(status_code=409, detail="No previous version to roll back to.")
+        version = _version_history[-1]
+    if version not in model_registry.list_versions():
+        raise HTTPException(status_code=404, detail=f"Unknown model version {version}")
+    try:
+        activate_version(version, record_history=False)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load version {version}: {e}")
+    if _version_history and _version_history[-1] == version:
+        _version_history.pop()
+    get_forecast()
+    return model_info()
 
 
+#------------fine-tunining---------------------------------------------
 def daily_finetuning_job():
     try:
         print("Running daily fine-tuning job...")
-        new_data = fetch_yesterday_data()
-        print("Fetched data:", new_data)
-        df = update_historical_data(new_data)
-        print("Historical data updated.")
-        global model, scaler  
-        model, scaler = fine_tune_model_with_data(df, scaler, model)
-        print("Model fine-tuned successfully.")
+        base_version = _active.version
+        result = subprocess.run(
+            [sys.executable, "finetune_worker.py", "--base-version", str(base_version)],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True
+        )
+        print(result.stdout)
+        if result.returncode != 0:
+            raise Exception(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "worker failed")
+        new_version = int(result.stdout.strip().splitlines()[-1].split()[-1])
+        activate_version(new_version)
+        get_forecast()
+        print("Forecast cache refreshed.")
     except Exception as e:
         print("Error during daily fine-tuning job:", e)
 
@@ -222,5 +269,6 @@ scheduler.add_job(daily_finetuning_job, 'cron', hour=6, minute=50)
 
 
 if __name__ == "__main__":
+    get_forecast()
     scheduler.start()
     uvicorn.run(app, host="0.0.0.0", port=5020)
@@ -0,0 +1,68 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def window_view(data: np.ndarray, seq_length: int) -> np.ndarray:
+    """
+    Read-only (n_windows, seq_length, n_features) view over a (n_rows, n_features)
+    array. No window is copied until the caller indexes into it.
+    """
+    return sliding_window_view(data, seq_length, axis=0).swapaxes(1, 2)
+
+
+def count_windows(n_rows: int, seq_length: int, pred_length: int) -> int:
+    return max(0, n_rows - seq_length - pred_length + 1)
+
+
+def supervised_windows(data, seq_length, pred_length, target_col=3, last_n=None):
+    """
+    Builds (X, y) for multi-step forecasting, materializing only the last
+    `last_n` windows (all of them if `last_n` is None).
+
+    X has shape (n, seq_length, n_features) and y has shape (n, pred_length),
+    y[i] being the `target_col` values of the pred_length rows after X[i].
+    """
+    n_features = data.shape[1]
+    n_windows = count_windows(len(data), seq_length, pred_length)
+    if last_n is not None:
+        n_windows = min(n_windows, last_n)
+    if n_windows == 0:
+        return np.empty((0, seq_length, n_features)), np.empty((0, pred_length))
+
+    # Only the rows covered by the selected windows and their targets are touched
+    tail = data[len(data) - (n_windows + seq_length + pred_length - 1):]
+    X = window_view(tail[:n_windows + seq_length - 1], seq_length)
+    y = sliding_window_view(tail[seq_length:, target_col], pred_length)
+    return np.array(X), np.array(y)
+
+
+def window_batches(data, seq_length, pred_length, target_col=3, batch_size=256, indices=None):
+    """
+    Yields (X, y) batches over the windows of `data` in order, or over the
+    window `indices` if given, copying one batch at a time.
+    """
+    X_view = window_view(data[:len(data) - pred_length], seq_length)
+    y_view = sliding_window_view(data[seq_length:, target_col], pred_length)
+    n_windows = count_windows(len(data), seq_length, pred_length)
+    if indices is None:
+        indices = np.arange(n_windows)
+    for start in range(0, len(indices), batch_size):
+        batch = indices[start:start + batch_size]
+        yield X_view[batch], y_view[batch]
+
+
+def as_tf_dataset(data, seq_length, pred_length, target_col=3, batch_size=256, indices=None):
+    """Wraps `window_batches` in a batched tf.data.Dataset for model.fit."""
+    import tensorflow as tf
+
+    n_features = data.shape[1]
+    output_signature = (
+        tf.TensorSpec(shape=(None, seq_length, n_features), dtype=tf.float32),
+        tf.TensorSpec(shape=(None, pred_length), dtype=tf.float32),
+    )
+
+    def generator():
+        for X, y in window_batches(data, seq_length, pred_length, target_col, batch_size, indices):
+            yield X.astype(np.float32), y.astype(np.float32)
+
+    return tf.data.Dataset.from_generator(generator, output_signature=output_signature)
@@ -1,6 +1,8 @@
 from collections import deque
 import asyncio
 import time
+import hashlib
+import threading
 import dotenv
 from telethon import TelegramClient, events
 from fastapi import FastAPI
@@ -86,6 +88,132 @@ News:
 {news}
 """
 
+def get_telegram_messages_delta_prompt(verdict, messages):
+    return f"""
+You are a sentiment analysis model and chatbot for cryptocurrency topics.
+Below is your current analysis of earlier Telegram messages discussing potential pump and dump schemes,
+followed by the messages that arrived since. Update the analysis so it covers both:
+1. Whether the messages are discussing a pump or dump scheme (return a boolean).
+2. The cryptocurrencies being discussed.
+3. A summary paragraph of what the messages are about.
+
+Current analysis:
+{json.dumps(verdict)}
+
+New messages:
+{messages}
+
+Return the result in the following JSON format:
+{{
+    "is_pump_and_dump": boolean,
+    "cryptocurrencies": [list of cryptocurrencies],
+    "summary": "summary paragraph"
+}}
+"""
+
+def get_news_delta_prompt(verdict, news):
+    return f"""
+You are a sentiment analysis model and chatbot specialized in cryptocurrency news.
+Below is your current classification of earlier news headlines, followed by the headlines that arrived since.
+Update it so it covers both, classifying the new headlines into:
+1. Political sentiment about crypto,
+2. Technical analysis of the market,
+3. News about new coins or projects.
+
+Current classification:
+{json.dumps(verdict)}
+
+Return a JSON object with the same format as the current classification.
+
+New news:
+{news}
+"""
+
+def parse_telegram_analysis(content):
+    """The analysis from the LLM answer, and whether it could be parsed."""
+    try:
+        content_json = content.split("```json")[-1].split("```")[0].strip()
+        analysis_result = json.loads(content_json)
+        fixed_analysis = {
+            "is_pump_and_dump": bool(analysis_result.get("is_pump_and_dump", False)),
+            "cryptocurrencies": analysis_result.get("cryptocurrencies", []),
+            "summary": analysis_result.get("summary", "")
+        }
+        if not isinstance(fixed_analysis["cryptocurrencies"], list):
+            fixed_analysis["cryptocurrencies"] = []
+        else:
+            fixed_analysis["cryptocurrencies"] = [str(crypto) for crypto in fixed_analysis["cryptocurrencies"]]
+        return fixed_analysis, True
+    except (ValueError, IndexError, AttributeError, json.JSONDecodeError) as e:
+        print(f"Failed to parse JSON: {e}")
+        return {
+            "is_pump_and_dump": False,
+            "cryptocurrencies": [],
+            "summary": "Failed to parse LLM response correctly."
+        }, False
+
+def parse_news_analysis(content):
+    try:
+        content_json = content.split("```json")[-1].split("```")[0].strip()
+        return json.loads(content_json), True
+    except Exception as e:
+        print(f"Failed to parse JSON: {e}")
+        return {}, False
+
+def window_key(messages):
+    """Content hash of a message window: the same messages give the same key."""
+    canonical = json.dumps([(m["group_id"], m["message_id"], m["text"]) for m in messages])
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def message_key(message):
+    return (message["group_id"], message["message_id"])
+
+class RollingVerdict:
+    """
+    LLM analysis of a message window, cached under the window's content hash.
+
+    A GET for an unchanged window is answered from the cache. When messages
+    arrive, only those are sent, together with the current verdict for the
+    model to update. Once a whole window's worth of messages has been merged
+    that way the window is analyzed from scratch, so messages that left it
+    stop weighing on the verdict. Concurrent GETs for the same window wait
+    for one analysis instead of each paying for their own; answers that
+    cannot be parsed are returned but not cached.
+    """
+
+    def __init__(self, full_prompt, delta_prompt, parse, window_size):
+        self.full_prompt = full_prompt
+        self.delta_prompt = delta_prompt
+        self.parse = parse
+        self.window_size = window_size
+        # (window key, verdict), replaced as a whole so readers never see a mixed pair
+        self.cached = (None, None)
+        self.analyzed = set()
+        self.merged_since_full = 0
+        self.lock = threading.Lock()
+
+    def get(self, messages):
+        key = window_key(messages)
+        if self.cached[0] == key:
+            return self.cached[1]
+        with self.lock:
+            cached_key, verdict = self.cached
+            if cached_key == key:
+                return verdict
+            new_messages = [m for m in messages if message_key(m) not in self.analyzed]
+            merged = self.merged_since_full + len(new_messages)
+            if verdict is None or not new_messages or merged >= self.window_size:
+                prompt, merged = self.full_prompt(messages), 0
+            else:
+                prompt = self.delta_prompt(verdict, new_messages)
+            analysis = asyncio.run(get_llm_sentiment_verdict(prompt))
+            result, parsed = self.parse(analysis.content)
+            if parsed:
+                self.cached = (key, result)
+                self.analyzed = {message_key(m) for m in messages}
+                self.merged_since_full = merged
+            return result
+
 client = TelegramClient('sentiment_analysis_session', API_ID, API_HASH)
 app = FastAPI(description="Crypto Sentiment Analysis API", version="0.1")
 
@@ -136,56 +264,27 @@ async def get_llm_sentiment_verdict(prompt):
     )
     return chat_response.choices[0].message
 
+pnd_verdict = RollingVerdict(get_telegram_messages_prompt, get_telegram_messages_delta_prompt,
+                             parse_telegram_analysis, pnd_unsent_messages.maxlen)
+news_verdict = RollingVerdict(get_news_prompt, get_news_delta_prompt, parse_news_analysis,
+                              news_unsent_messages.maxlen)
+
 @app.get("/telegram/messages")
 def get_messages():
     messages_to_send = list(pnd_unsent_messages)  
-    analysis = asyncio.run(get_llm_sentiment_verdict(get_telegram_messages_prompt(messages_to_send)))
-    content = analysis.content  
-
-    try:
-        content_json = content.split("```json")[-1].split("```")[0].strip()
-        analysis_result = json.loads(content_json)
-        fixed_analysis = {
-            "is_pump_and_dump": bool(analysis_result.get("is_pump_and_dump", False)),
-            "cryptocurrencies": analysis_result.get("cryptocurrencies", []),
-            "summary": analysis_result.get("summary", "")
-        }
-        if not isinstance(fixed_analysis["cryptocurrencies"], list):
-            fixed_analysis["cryptocurrencies"] = []
-        else:
-            fixed_analysis["cryptocurrencies"] = [str(crypto) for crypto in fixed_analysis["cryptocurrencies"]]
-
-    except (ValueError, IndexError, json.JSONDecodeError) as e:
-        print(f"Failed to parse JSON: {e}")
-        fixed_analysis = {
-            "is_pump_and_dump": False,
-            "cryptocurrencies": [],
-            "summary": "Failed to parse LLM response correctly."
-        }
-    
     return {
         "messages": messages_to_send,
         "count": len(messages_to_send),
-        "analysis": fixed_analysis  
+        "analysis": pnd_verdict.get(messages_to_send)
     }
 
 @app.get("/news")
 def get_news():
     messages_to_send = list(news_unsent_messages)  
-    analysis = asyncio.run(get_llm_sentiment_verdict(get_news_prompt(messages_to_send)))
-    content = analysis.content
-
-    try:
-        content_json = content.split("```json")[-1].split("```")[0].strip()
-        analysis_result = json.loads(content_json)
-    except Exception as e:
-        print(f"Failed to parse JSON: {e}")
-        analysis_result = {}
-
     return {
         "news": messages_to_send,
         "count": len(messages_to_send),
-        "analysis": analysis_result
+        "analysis": news_verdict.get(messages_to_send)
     }
 
 async def main():